@@ -1,17 +1,20 @@
 """Analysis application module."""
 
-from flask import Flask, jsonify
+import json
+import threading
+from datetime import date
+from flask import Flask, Response, jsonify, request
 from sqlalchemy import create_engine, func
 from sqlalchemy.orm import sessionmaker
 from ..db.models import Base, DailyMetrics, Fundamentals
+from .batch import MAX_BATCH_TICKERS, batch_executor, iter_ticker_metrics
+from .resample import ResampleCache, parse_period
+from .screener import ScreenExpressionError, UniverseSnapshot
 import os
 
 
-def create_app():
-    """Create and configure the analysis Flask app."""
-    app = Flask(__name__)
-
-    # PostgreSQL database configuration using shared models
+def get_database_url():
+    """Get PostgreSQL database URL from environment variables."""
     database_url = os.getenv('DATABASE_URL')
     if not database_url:
         host = os.getenv('DB_HOST', 'postgres')  # Default to Docker service
@@ -20,12 +23,46 @@ def create_app():
         user = os.getenv('DB_USER', 'taro_user')
         password = os.getenv('DB_PASSWORD', 'taro_password')
         database_url = f"postgresql://{user}:{password}@{host}:{port}/{name}"
+    return database_url
+
+
+def parse_date_arg(args, name):
+    """Parse an optional ISO date query argument."""
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} date {value!r}, expected YYYY-MM-DD")
+
+
+def create_app():
+    """Create and configure the analysis Flask app."""
+    app = Flask(__name__)
 
+    # PostgreSQL database configuration using shared models
+    database_url = get_database_url()
     app.config['DATABASE_URL'] = database_url
 
     # Create engine and session
     engine = create_engine(database_url)
     Session = sessionmaker(bind=engine)
+    batch_pool = batch_executor(engine)
+    resample_cache = ResampleCache()
+    universe = UniverseSnapshot()
+
+    def warm_universe():
+        """Load the screener snapshot at startup so no request pays for the initial load."""
+        session = Session()
+        try:
+            universe.refresh(session)
+        except Exception:
+            app.logger.exception("Could not load the screener snapshot; /screen will retry")
+        finally:
+            session.close()
+
+    threading.Thread(target=warm_universe, name='screener-warmup', daemon=True).start()
 
     @app.route('/health')
     def health_check():
@@ -52,6 +89,23 @@ def create_app():
         finally:
             session.close()
 
+    @app.route('/metrics/batch', methods=['GET', 'POST'])
+    def get_metrics_for_tickers():
+        """Stream metrics for many tickers as NDJSON, one line per ticker."""
+        if request.method == 'POST':
+            payload = request.get_json(silent=True)
+            tickers = payload.get('tickers') if isinstance(payload, dict) else None
+        else:
+            tickers = [t for t in request.args.get('tickers', '').split(',') if t]
+
+        if not tickers or not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+            return {'error': "Expected a non-empty list of 'tickers'"}, 400
+        if len(tickers) > MAX_BATCH_TICKERS:
+            return {'error': f"At most {MAX_BATCH_TICKERS} tickers per request"}, 400
+
+        lines = (json.dumps(row) + '\n' for row in iter_ticker_metrics(Session, tickers, executor=batch_pool))
+        return Response(lines, mimetype='application/x-ndjson')
+
     @app.route('/metrics/<ticker>')
     def get_metrics_for_ticker(ticker):
         """Get metrics for a specific ticker from shared tables."""
@@ -73,6 +127,53 @@ def create_app():
         finally:
             session.close()
 
+    @app.route('/resample/<ticker>')
+    def get_resampled_bars(ticker):
+        """Get weekly, monthly or custom-length OHLCV bars for a ticker."""
+        period = request.args.get('period', 'week')
+        try:
+            parse_period(period)
+            start = parse_date_arg(request.args, 'start')
+            end = parse_date_arg(request.args, 'end')
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        session = Session()
+        try:
+            bars = resample_cache.get(session, ticker, period, start=start, end=end)
+            return {
+                'ticker': ticker,
+                'period': period,
+                'bars': bars
+            }
+        finally:
+            session.close()
+
+    @app.route('/screen')
+    def screen_universe():
+        """Screen every ticker in the in-memory snapshot with a filter expression."""
+        expression = request.args.get('q')
+        if not expression:
+            return {'error': "Missing screen expression 'q'"}, 400
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit < 0:
+            return {'error': "'limit' must not be negative"}, 400
+
+        # Never wait behind a running refresh; serve the current snapshot instead
+        session = Session()
+        try:
+            universe.refresh(session, blocking=False)
+        finally:
+            session.close()
+        if not universe.loaded:
+            return {'error': "Screener snapshot is still loading"}, 503
+
+        try:
+            result = universe.screen(expression, limit=limit)
+        except ScreenExpressionError as e:
+            return {'error': str(e)}, 400
+        return {'expression': expression, **result}
+
     return app
 
 
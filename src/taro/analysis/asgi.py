@@ -0,0 +1,209 @@
+"""Async (ASGI) serving mode for the analysis service.
+
+Exposes the same routes as :func:`taro.analysis.app.create_app` using Quart
+on an asyncpg connection pool. Independent queries within a request run
+concurrently, and every request is bounded by ``REQUEST_TIMEOUT``. A request
+that times out or whose client disconnects is cancelled, and asyncpg cancels
+the running query on the server. Serve it with::
+
+    hypercorn 'taro.analysis.asgi:create_asgi_app()' --bind 0.0.0.0:8000
+"""
+
+import asyncio
+import json
+import os
+import weakref
+from functools import wraps
+
+from quart import Quart, Response, request
+from sqlalchemy import func, make_url, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ..db.models import Base, DailyMetrics, Fundamentals
+from .app import get_database_url, parse_date_arg
+from .batch import DEFAULT_CHUNK_SIZE, MAX_BATCH_TICKERS, batch_workers, query_ticker_metrics
+from .resample import ResampleCache, parse_period
+from .screener import ScreenExpressionError, UniverseSnapshot
+
+
+def create_asgi_app():
+    """Create and configure the async analysis Quart app."""
+    app = Quart(__name__)
+
+    database_url = make_url(get_database_url()).set(drivername='postgresql+asyncpg')
+    request_timeout = float(os.getenv('REQUEST_TIMEOUT', '10'))
+    app.config['DATABASE_URL'] = database_url.render_as_string(hide_password=True)
+    app.config['REQUEST_TIMEOUT'] = request_timeout
+    app.config['RESPONSE_TIMEOUT'] = request_timeout  # bounds streamed bodies too
+
+    engine = create_async_engine(
+        database_url,
+        pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+        max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        pool_pre_ping=True,
+        # Server-side backstop in case a cancelled query is not interrupted client-side
+        connect_args={'server_settings': {'statement_timeout': str(int(request_timeout * 1000))}},
+    )
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    # Shared by all batch requests so together they leave pooled connections for other routes
+    batch_slots = asyncio.Semaphore(batch_workers(engine.sync_engine))
+
+    resample_cache = ResampleCache()
+    universe = UniverseSnapshot()
+    # ResampleCache holds a threading lock per (ticker, period) across its
+    # queries. run_sync executes on the event loop thread, so coroutines queue
+    # here first instead of blocking the loop on a held threading lock. The
+    # snapshot refresh is only ever attempted without blocking.
+    resample_locks = weakref.WeakValueDictionary()  # (ticker, period) -> asyncio.Lock, while in use
+
+    async def scalar(stmt):
+        """Run one query on its own pooled connection so several can run at once."""
+        async with Session() as session:
+            return (await session.execute(stmt)).scalar()
+
+    async def run_sync(fn, *args, **kwargs):
+        """Run a sync-session helper (resample, screener, batch) over the async connection."""
+        async with Session() as session:
+            return await session.run_sync(lambda sync_session: fn(sync_session, *args, **kwargs))
+
+    def with_timeout(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            try:
+                async with asyncio.timeout(request_timeout):
+                    return await view(*args, **kwargs)
+            except TimeoutError:
+                return {'error': f"Request timed out after {request_timeout:g}s"}, 504
+        return wrapper
+
+    @app.before_serving
+    async def warm_universe():
+        """Load the screener snapshot in the background so no request pays for the initial load."""
+        async def load():
+            try:
+                await run_sync(universe.refresh)
+            except Exception:
+                app.logger.exception("Could not load the screener snapshot; /screen will retry")
+        app.add_background_task(load)
+
+    @app.after_serving
+    async def dispose_engine():
+        await engine.dispose()
+
+    @app.route('/health')
+    @with_timeout
+    async def health_check():
+        return {'status': 'healthy', 'service': 'analysis', 'database': app.config['DATABASE_URL']}
+
+    @app.route('/tables')
+    @with_timeout
+    async def list_tables():
+        """List all available tables in shared schema."""
+        tables = list(Base.metadata.tables.keys())
+        return {'tables': tables, 'service': 'analysis'}
+
+    @app.route('/metrics')
+    @with_timeout
+    async def get_metrics():
+        """Get overall analysis metrics from shared tables."""
+        daily_metrics_count, fundamentals_count = await asyncio.gather(
+            scalar(select(func.count(DailyMetrics.id))),
+            scalar(select(func.count(Fundamentals.id))),
+        )
+        return {
+            'total_daily_metrics': daily_metrics_count,
+            'total_fundamentals': fundamentals_count
+        }
+
+    @app.route('/metrics/batch', methods=['GET', 'POST'])
+    @with_timeout
+    async def get_metrics_for_tickers():
+        """Stream metrics for many tickers as NDJSON, one line per ticker."""
+        if request.method == 'POST':
+            payload = await request.get_json(silent=True)
+            tickers = payload.get('tickers') if isinstance(payload, dict) else None
+        else:
+            tickers = [t for t in request.args.get('tickers', '').split(',') if t]
+
+        if not tickers or not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+            return {'error': "Expected a non-empty list of 'tickers'"}, 400
+        if len(tickers) > MAX_BATCH_TICKERS:
+            return {'error': f"At most {MAX_BATCH_TICKERS} tickers per request"}, 400
+
+        tickers = list(dict.fromkeys(tickers))
+        chunks = [tickers[i:i + DEFAULT_CHUNK_SIZE] for i in range(0, len(tickers), DEFAULT_CHUNK_SIZE)]
+
+        async def query_chunk(chunk):
+            async with batch_slots:
+                return await run_sync(query_ticker_metrics, chunk)
+
+        async def lines():
+            tasks = [asyncio.ensure_future(query_chunk(chunk)) for chunk in chunks]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    for row in await next_done:
+                        yield json.dumps(row) + '\n'
+            finally:
+                # Client disconnects and timeouts cancel the chunks still in flight
+                for task in tasks:
+                    task.cancel()
+
+        return Response(lines(), mimetype='application/x-ndjson')
+
+    @app.route('/metrics/<ticker>')
+    @with_timeout
+    async def get_metrics_for_ticker(ticker):
+        """Get metrics for a specific ticker from shared tables."""
+        data_count, latest_date = await asyncio.gather(
+            scalar(select(func.count(DailyMetrics.id)).where(DailyMetrics.ticker == ticker)),
+            scalar(select(func.max(DailyMetrics.trade_date)).where(DailyMetrics.ticker == ticker)),
+        )
+        return {
+            'ticker': ticker,
+            'data_points': data_count,
+            'latest_date': str(latest_date) if latest_date else None
+        }
+
+    @app.route('/resample/<ticker>')
+    @with_timeout
+    async def get_resampled_bars(ticker):
+        """Get weekly, monthly or custom-length OHLCV bars for a ticker."""
+        period = request.args.get('period', 'week')
+        try:
+            parse_period(period)
+            start = parse_date_arg(request.args, 'start')
+            end = parse_date_arg(request.args, 'end')
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
+        async with resample_locks.setdefault((ticker, period), asyncio.Lock()):
+            bars = await run_sync(resample_cache.get, ticker, period, start=start, end=end)
+        return {
+            'ticker': ticker,
+            'period': period,
+            'bars': bars
+        }
+
+    @app.route('/screen')
+    @with_timeout
+    async def screen_universe():
+        """Screen every ticker in the in-memory snapshot with a filter expression."""
+        expression = request.args.get('q')
+        if not expression:
+            return {'error': "Missing screen expression 'q'"}, 400
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit < 0:
+            return {'error': "'limit' must not be negative"}, 400
+
+        # Never wait behind a running refresh; serve the current snapshot instead
+        await run_sync(universe.refresh, blocking=False)
+        if not universe.loaded:
+            return {'error': "Screener snapshot is still loading"}, 503
+
+        try:
+            result = universe.screen(expression, limit=limit)
+        except ScreenExpressionError as e:
+            return {'error': str(e)}, 400
+        return {'expression': expression, **result}
+
+    return app
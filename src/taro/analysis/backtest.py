@@ -0,0 +1,242 @@
+"""Vectorized backtesting over close-price arrays.
+
+Prices are ``(T, N)`` float arrays (T trading days, N tickers, NaN where a
+ticker has no bar). A strategy maps prices to target positions of the same
+shape; the position decided at close ``t`` earns the return of bar ``t + 1``.
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from taro.db.models import DailyMetrics, Fundamentals
+
+TRADING_DAYS = 252
+
+
+@dataclass
+class BacktestResult:
+    """Outcome of a single backtest run."""
+    positions: np.ndarray  # (T, N) target positions
+    returns: np.ndarray    # (T,) portfolio returns, equal-weighted over listed tickers, net of costs
+    equity: np.ndarray     # (T,) equity curve starting from 1.0
+    stats: dict
+
+
+def load_closes(session, tickers: list[str], start: date | None = None,
+                end: date | None = None) -> tuple[np.ndarray, list[str], np.ndarray]:
+    """
+    Load close prices for several tickers with one query.
+    :param session: SQLAlchemy session
+    :param tickers: Stock symbols, e.g. ['GOOGL', 'AAPL']
+    :param start: first trade date (inclusive)
+    :param end: last trade date (inclusive)
+    :return: (dates, tickers, closes) with closes shaped (len(dates), len(tickers));
+        tickers without any rows in the range are left out
+    """
+    query = session.query(
+        DailyMetrics.trade_date, DailyMetrics.ticker, Fundamentals.close_price
+    ).join(
+        Fundamentals, Fundamentals.daily_metrics_id == DailyMetrics.id
+    ).filter(DailyMetrics.ticker.in_(tickers))
+    if start is not None:
+        query = query.filter(DailyMetrics.trade_date >= start)
+    if end is not None:
+        query = query.filter(DailyMetrics.trade_date <= end)
+    rows = query.all()
+
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), [], np.empty((0, 0))
+
+    trade_dates, row_tickers, closes = zip(*rows)
+    found = set(row_tickers)
+    tickers = [ticker for ticker in dict.fromkeys(tickers) if ticker in found]
+    dates, date_idx = np.unique(np.array(trade_dates, dtype='datetime64[D]'), return_inverse=True)
+    column = {ticker: i for i, ticker in enumerate(tickers)}
+    ticker_idx = np.fromiter((column[t] for t in row_tickers), dtype=np.intp, count=len(rows))
+
+    prices = np.full((len(dates), len(tickers)), np.nan)
+    prices[date_idx, ticker_idx] = np.asarray(closes, dtype=float)
+    return dates, tickers, prices
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean along axis 0; NaN until ``window`` valid observations are available."""
+    if window < 1:
+        raise ValueError(f"window must be positive, got {window}")
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts == window, sums / counts, np.nan)
+
+
+def simple_returns(prices: np.ndarray) -> np.ndarray:
+    """Bar-over-bar returns; zero for the first bar and wherever a price is missing."""
+    returns = np.zeros_like(prices, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns[1:] = prices[1:] / prices[:-1] - 1.0
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def sma_crossover(prices: np.ndarray, fast: int = 20, slow: int = 50) -> np.ndarray:
+    """Long while the fast SMA is above the slow SMA, flat otherwise."""
+    if fast >= slow:
+        raise ValueError(f"fast window must be shorter than slow, got fast={fast}, slow={slow}")
+    with np.errstate(invalid='ignore'):
+        return (rolling_mean(prices, fast) > rolling_mean(prices, slow)).astype(float)
+
+
+def momentum(prices: np.ndarray, lookback: int = 20) -> np.ndarray:
+    """Long while the trailing ``lookback``-bar return is positive, flat otherwise."""
+    if lookback < 1:
+        raise ValueError(f"lookback must be positive, got {lookback}")
+    positions = np.zeros_like(prices, dtype=float)
+    with np.errstate(invalid='ignore'):
+        positions[lookback:] = prices[lookback:] > prices[:-lookback]
+    return positions
+
+
+def summary_stats(returns: np.ndarray, periods_per_year: int = TRADING_DAYS) -> dict:
+    """CAGR, annualized volatility, Sharpe ratio (zero risk-free rate) and max drawdown."""
+    if len(returns) == 0:
+        return {'total_return': 0.0, 'cagr': 0.0, 'volatility': 0.0, 'sharpe': 0.0, 'max_drawdown': 0.0}
+
+    equity = np.cumprod(1.0 + returns)
+    years = len(returns) / periods_per_year
+    cagr = equity[-1] ** (1.0 / years) - 1.0 if equity[-1] > 0 else -1.0
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    sharpe = returns.mean() / std * np.sqrt(periods_per_year) if std > 0 else 0.0
+    drawdown = equity / np.maximum.accumulate(np.maximum(equity, 1.0)) - 1.0
+
+    return {
+        'total_return': float(equity[-1] - 1.0),
+        'cagr': float(cagr),
+        'volatility': float(std * np.sqrt(periods_per_year)),
+        'sharpe': float(sharpe),
+        'max_drawdown': float(drawdown.min()),
+    }
+
+
+def run_backtest(prices: np.ndarray, positions: np.ndarray, cost_bps: float = 0.0,
+                 slippage_bps: float = 0.0) -> BacktestResult:
+    """
+    Turn target positions into an equal-weighted, cost-adjusted equity curve.
+
+    Each bar is averaged over the tickers that have a price on it, so names
+    not yet listed (NaN) don't count as cash.
+    :param prices: (T, N) or (T,) close prices
+    :param positions: target positions, same shape as prices
+    :param cost_bps: commission per unit of turnover, in basis points
+    :param slippage_bps: slippage per unit of turnover, in basis points
+    :return: BacktestResult
+    """
+    prices = np.asarray(prices, dtype=float)
+    if prices.ndim == 1:
+        prices = prices[:, None]
+    positions = np.nan_to_num(np.asarray(positions, dtype=float).reshape(prices.shape))
+
+    held = np.zeros_like(positions)
+    held[1:] = positions[:-1]
+    turnover = np.abs(np.diff(positions, axis=0, prepend=0.0))
+    costs = turnover * (cost_bps + slippage_bps) / 1e4
+
+    net = held * simple_returns(prices) - costs
+    listed = ~np.isnan(prices)
+    counts = listed.sum(axis=1)
+    returns = np.divide(np.where(listed, net, 0.0).sum(axis=1), counts,
+                        out=np.zeros(len(prices)), where=counts > 0)
+    stats = summary_stats(returns)
+    stats['turnover'] = float(turnover.sum(axis=0).mean())
+    return BacktestResult(
+        positions=positions,
+        returns=returns,
+        equity=np.cumprod(1.0 + returns),
+        stats=stats,
+    )
+
+
+def backtest(prices: np.ndarray, strategy, cost_bps: float = 0.0, slippage_bps: float = 0.0,
+             **params) -> BacktestResult:
+    """Run ``strategy(prices, **params)`` and evaluate the resulting positions."""
+    return run_backtest(prices, strategy(prices, **params), cost_bps=cost_bps, slippage_bps=slippage_bps)
+
+
+def parameter_grid(grid: dict) -> list[dict]:
+    """Expand {'fast': [10, 20], 'slow': [50]} into a list of parameter dicts."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+# Worker-side view onto the parent's shared price array, set by _attach_prices
+_shared_block = None
+_shared_prices = None
+
+
+def _attach_prices(name, shape, dtype):
+    global _shared_block, _shared_prices
+    _shared_block = shared_memory.SharedMemory(name=name)
+    _shared_prices = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_shared_block.buf)
+
+
+def _run_params(strategy, params, cost_bps, slippage_bps, prices=None):
+    try:
+        result = backtest(
+            _shared_prices if prices is None else prices, strategy,
+            cost_bps=cost_bps, slippage_bps=slippage_bps, **params
+        )
+    except ValueError:
+        return None  # the strategy rejected this combination, e.g. fast >= slow
+    return {'params': params, **result.stats}
+
+
+def sweep(prices: np.ndarray, strategy, grid: dict, cost_bps: float = 0.0, slippage_bps: float = 0.0,
+          max_workers: int | None = None) -> list[dict]:
+    """
+    Backtest every parameter combination in ``grid``, best Sharpe ratio first.
+
+    The price array is copied once into shared memory and every worker process
+    maps it read-only, so only parameters and summary stats are pickled.
+    ``strategy`` must be a module-level function so it can be sent to workers.
+    Combinations the strategy rejects with ValueError are left out.
+    :param prices: (T, N) close prices
+    :param strategy: callable(prices, **params) -> positions
+    :param grid: parameter name -> list of values
+    :param max_workers: process count; 1 runs in-process
+    :return: list of {'params': ..., <summary stats>}
+    """
+    prices = np.ascontiguousarray(prices, dtype=float)
+    combos = parameter_grid(grid)
+    max_workers = max_workers or min(len(combos), os.cpu_count() or 1)
+
+    if max_workers <= 1 or len(combos) <= 1:
+        results = [_run_params(strategy, p, cost_bps, slippage_bps, prices=prices) for p in combos]
+    else:
+        block = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+        shared = np.ndarray(prices.shape, dtype=prices.dtype, buffer=block.buf)
+        try:
+            shared[:] = prices
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_attach_prices,
+                initargs=(block.name, prices.shape, prices.dtype.str),
+            ) as pool:
+                results = list(pool.map(
+                    _run_params,
+                    itertools.repeat(strategy), combos,
+                    itertools.repeat(cost_bps), itertools.repeat(slippage_bps),
+                    chunksize=max(1, len(combos) // (max_workers * 4)),
+                ))
+        finally:
+            del shared  # release the buffer export before closing the block
+            block.close()
+            block.unlink()
+
+    return sorted((r for r in results if r is not None), key=lambda r: r['sharpe'], reverse=True)
@@ -0,0 +1,103 @@
+"""Per-ticker summary metrics for many tickers at once."""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+
+from taro.db.models import DailyMetrics, Fundamentals
+
+# Tickers per grouped query; larger requests are split and run concurrently
+DEFAULT_CHUNK_SIZE = 200
+
+# Chunk queries in flight across all batch requests of an app; see batch_executor
+DEFAULT_MAX_WORKERS = 4
+
+MAX_BATCH_TICKERS = 10000
+
+
+def query_ticker_metrics(session, tickers: list[str]) -> list[dict]:
+    """
+    Summarize several tickers with one grouped query.
+    :param session: SQLAlchemy session
+    :param tickers: Stock symbols, e.g. ['GOOGL', 'AAPL']
+    :return: one dict per requested ticker, in request order; unknown tickers have 0 data points
+    """
+    rows = session.query(
+        DailyMetrics.ticker,
+        func.count(DailyMetrics.id),
+        func.min(DailyMetrics.trade_date),
+        func.max(DailyMetrics.trade_date),
+        array_agg(aggregate_order_by(Fundamentals.close_price, DailyMetrics.trade_date.desc()))[1],
+    ).outerjoin(
+        Fundamentals, Fundamentals.daily_metrics_id == DailyMetrics.id
+    ).filter(
+        DailyMetrics.ticker.in_(tickers)
+    ).group_by(DailyMetrics.ticker).all()
+
+    found = {
+        ticker: {
+            'ticker': ticker,
+            'data_points': count,
+            'first_date': str(first_date),
+            'latest_date': str(latest_date),
+            'last_close': float(last_close) if last_close is not None else None,
+        }
+        for ticker, count, first_date, latest_date, last_close in rows
+    }
+    return [
+        found.get(ticker) or {
+            'ticker': ticker,
+            'data_points': 0,
+            'first_date': None,
+            'latest_date': None,
+            'last_close': None,
+        }
+        for ticker in tickers
+    ]
+
+
+def batch_workers(engine, max_workers: int = DEFAULT_MAX_WORKERS) -> int:
+    """Concurrent chunk queries that still leave one pooled connection for other requests."""
+    pool_size = getattr(engine.pool, 'size', lambda: max_workers + 1)()
+    return max(1, min(max_workers, pool_size - 1))
+
+
+def batch_executor(engine, max_workers: int = DEFAULT_MAX_WORKERS) -> ThreadPoolExecutor:
+    """Executor shared by every batch request of an app, so their chunks queue for the same workers."""
+    return ThreadPoolExecutor(max_workers=batch_workers(engine, max_workers), thread_name_prefix='metrics-batch')
+
+
+def iter_ticker_metrics(Session, tickers: list[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        executor: ThreadPoolExecutor | None = None):
+    """
+    Yield per-ticker metrics chunk by chunk as each chunk's query completes.
+    :param Session: sessionmaker; each concurrent chunk uses its own session and pooled connection
+    :param tickers: Stock symbols; duplicates are dropped
+    :param chunk_size: tickers per grouped query
+    :param executor: shared executor from :func:`batch_executor`; None queries chunks one by one
+    """
+    tickers = list(dict.fromkeys(tickers))
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+
+    if len(chunks) <= 1 or executor is None:
+        for chunk in chunks:
+            yield from _query_chunk(Session, chunk)
+        return
+
+    futures = [executor.submit(_query_chunk, Session, chunk) for chunk in chunks]
+    try:
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        # Don't start queries nobody will read if the client went away
+        for future in futures:
+            future.cancel()
+
+
+def _query_chunk(Session, chunk):
+    session = Session()
+    try:
+        return query_ticker_metrics(session, chunk)
+    finally:
+        session.close()
@@ -0,0 +1,114 @@
+"""Closed-loop HTTP load test for comparing the Flask and ASGI analysis apps.
+
+Start both servers against the same database, then point the script at them::
+
+    flask --app 'taro.analysis.app:create_app()' run --port 5001 --with-threads
+    hypercorn 'taro.analysis.asgi:create_asgi_app()' --bind 127.0.0.1:8000
+
+    python -m taro.analysis.loadtest http://127.0.0.1:5001 http://127.0.0.1:8000 \\
+        --path /metrics --path /metrics/GOOGL --concurrency 32 --duration 10
+
+Each of ``--concurrency`` workers keeps one keep-alive connection open and
+sends the next request as soon as the previous one completes, cycling
+through the given paths.
+"""
+
+import argparse
+import http.client
+import itertools
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    rank = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_load(base_url: str, paths: list[str], concurrency: int = 16, duration: float = 10.0,
+             warmup: float = 1.0, timeout: float = 30.0) -> dict:
+    """
+    Drive one server and summarize its latency and throughput.
+    :param base_url: e.g. 'http://127.0.0.1:5001'
+    :param paths: request paths, cycled per worker
+    :param concurrency: concurrent keep-alive connections
+    :param duration: measured seconds, after ``warmup`` unmeasured seconds
+    :return: dict with requests, errors, rps, p50_ms and p99_ms
+    """
+    target = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if target.scheme == 'https' else http.client.HTTPConnection
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(offset):
+        local_latencies, local_errors = [], 0
+        conn = connection_class(target.netloc, timeout=timeout)
+        for path in itertools.islice(itertools.cycle(paths), offset, None):
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                break
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = connection_class(target.netloc, timeout=timeout)
+            if sent >= start_at:
+                if ok:
+                    local_latencies.append(time.perf_counter() - sent)
+                else:
+                    local_errors += 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'target': base_url,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m taro.analysis.loadtest',
+        description='Compare latency and throughput of analysis service deployments')
+    parser.add_argument('targets', nargs='+', help='base URLs, e.g. http://127.0.0.1:5001')
+    parser.add_argument('--path', action='append', dest='paths',
+                        help='request path (repeatable), default /metrics')
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='measured seconds per target')
+    parser.add_argument('--warmup', type=float, default=1.0, help='unmeasured seconds per target')
+    args = parser.parse_args(argv)
+    paths = args.paths or ['/metrics']
+
+    print(f"{'target':<32}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for target in args.targets:
+        r = run_load(target, paths, concurrency=args.concurrency, duration=args.duration, warmup=args.warmup)
+        print(f"{r['target']:<32}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+"""Resample stored daily bars into weekly, monthly or custom-length OHLCV bars."""
+
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from sqlalchemy import Date, cast, func, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+
+from taro.analysis.watermark import REFRESH_ID_MARGIN, latest_ids, recent_rows
+from taro.db.models import DailyMetrics, Fundamentals
+
+# Calendar periods map directly onto PostgreSQL date_trunc units
+CALENDAR_PERIODS = ('week', 'month', 'quarter', 'year')
+
+# Custom "<n>d" buckets are counted from a fixed Monday so they line up with weeks
+BUCKET_EPOCH = date(1970, 1, 5)
+
+# Cached (ticker, period) entries kept; the least recently used is evicted first
+DEFAULT_MAX_ENTRIES = 256
+
+# Seconds after which an entry is re-aggregated in full, picking up updated rows
+DEFAULT_MAX_AGE = 300.0
+
+_CUSTOM_PERIOD = re.compile(r'^([1-9][0-9]{0,3})d$')
+
+
+def parse_period(period: str) -> tuple[str, int]:
+    """
+    Validate a period name.
+    :param period: 'week', 'month', 'quarter', 'year' or '<n>d', e.g. '10d'
+    :return: (unit, n) where unit is a calendar period or 'day'
+    """
+    if period in CALENDAR_PERIODS:
+        return period, 1
+    match = _CUSTOM_PERIOD.match(period or '')
+    if match:
+        return 'day', int(match.group(1))
+    raise ValueError(
+        f"Unsupported period {period!r}; use one of {', '.join(CALENDAR_PERIODS)} or '<n>d'"
+    )
+
+
+def bucket_bounds(period: str, day: date) -> tuple[date, date]:
+    """Return the [start, end) date range of the bucket containing ``day``."""
+    unit, n = parse_period(period)
+    if unit == 'day':
+        start = day - timedelta(days=(day - BUCKET_EPOCH).days % n)
+        return start, start + timedelta(days=n)
+    if unit == 'week':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if unit == 'year':
+        return date(day.year, 1, 1), date(day.year + 1, 1, 1)
+
+    months = 1 if unit == 'month' else 3
+    first_month = (day.month - 1) // months * months + 1
+    start = date(day.year, first_month, 1)
+    next_month = first_month + months
+    end = date(day.year + (next_month - 1) // 12, (next_month - 1) % 12 + 1, 1)
+    return start, end
+
+
+def bucket_start_expr(period: str, column=DailyMetrics.trade_date):
+    """SQL expression mapping a date column onto the start of its bucket.
+
+    Mirrors :func:`bucket_bounds`. Only validated constants are inlined so the
+    expression renders identically in SELECT and GROUP BY.
+    """
+    unit, n = parse_period(period)
+    if unit == 'day':
+        epoch = literal_column(f"DATE '{BUCKET_EPOCH.isoformat()}'", Date)
+        return column - ((column - epoch) % literal_column(str(n)))
+    return cast(func.date_trunc(literal_column(f"'{unit}'"), column), Date)
+
+
+def aggregate_bars(session, ticker: str, period: str, start: date | None = None,
+                   end: date | None = None) -> list[dict]:
+    """
+    Aggregate daily bars for one ticker in a single grouped query.
+    :param session: SQLAlchemy session
+    :param ticker: Stock symbol, e.g. 'GOOGL'
+    :param period: see :func:`parse_period`
+    :param start: first trade date to include (inclusive)
+    :param end: last trade date to include (exclusive)
+    :return: list of bar dicts ordered by period_start
+    """
+    bucket = bucket_start_expr(period).label('period_start')
+    query = session.query(
+        bucket,
+        array_agg(aggregate_order_by(Fundamentals.open_price, DailyMetrics.trade_date.asc()))[1],
+        func.max(Fundamentals.high_price),
+        func.min(Fundamentals.low_price),
+        array_agg(aggregate_order_by(Fundamentals.close_price, DailyMetrics.trade_date.desc()))[1],
+        func.sum(Fundamentals.volume),
+        func.count(DailyMetrics.id),
+    ).join(
+        Fundamentals, Fundamentals.daily_metrics_id == DailyMetrics.id
+    ).filter(DailyMetrics.ticker == ticker)
+
+    if start is not None:
+        query = query.filter(DailyMetrics.trade_date >= start)
+    if end is not None:
+        query = query.filter(DailyMetrics.trade_date < end)
+
+    rows = query.group_by(bucket).order_by(bucket).all()
+    return [
+        {
+            'period_start': period_start,
+            'open': float(open_price),
+            'high': float(high_price),
+            'low': float(low_price),
+            'close': float(close_price),
+            'volume': float(volume),
+            'days': days,
+        }
+        for period_start, open_price, high_price, low_price, close_price, volume, days in rows
+    ]
+
+
+class ResampleCache:
+    """In-process LRU cache of resampled bars keyed by (ticker, period).
+
+    New ingests are detected from the ``daily_metrics.id`` and
+    ``fundamentals.id`` high-water marks; only the buckets containing newly
+    committed trade dates are re-aggregated, every other cached bucket is
+    served as-is. The ticker's rows among the last ``id_margin`` ids are
+    re-read on every call, since a lower id can commit after a higher one.
+    Updates to existing rows don't change ids, so entries older than
+    ``max_age`` seconds are rebuilt in full.
+
+    Queries run under a lock per (ticker, period), so requests for different
+    keys proceed concurrently; the shared lock only guards the dictionaries.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_age: float = DEFAULT_MAX_AGE,
+                 id_margin: int = REFRESH_ID_MARGIN):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.id_margin = id_margin
+        self._bars = OrderedDict()  # (ticker, period) -> {period_start: bar}, least recently used first
+        self._built_at = {}   # (ticker, period) -> monotonic time of the full aggregation
+        self._stale = {}      # (ticker, period) -> {period_start}
+        self._watermark = {}  # ticker -> (max daily_metrics.id, max fundamentals.id) at its last call
+        self._seen = {}       # ticker -> {(daily_metrics.id, fundamentals.id)} read within the margin
+        self._lock = threading.Lock()  # never held across a query
+        self._key_locks = weakref.WeakValueDictionary()  # (ticker, period) -> lock, while in use
+
+    def get(self, session, ticker: str, period: str, start: date | None = None,
+            end: date | None = None) -> list[dict]:
+        """Return cached bars whose bucket overlaps [start, end], both inclusive."""
+        parse_period(period)
+        key = (ticker, period)
+
+        with self.key_lock(key):
+            self._absorb_new_rows(session, ticker)
+            with self._lock:
+                bars = self._bars.get(key)
+                expired = bars is None or time.monotonic() - self._built_at[key] > self.max_age
+                # Taken before querying; buckets invalidated meanwhile stay stale for the next call
+                stale = self._stale.pop(key, None)
+                if not expired:
+                    self._bars.move_to_end(key)
+
+            if expired:
+                bars = {bar['period_start']: bar for bar in aggregate_bars(session, ticker, period)}
+                with self._lock:
+                    self._store(key, bars)
+            elif stale:
+                self._refresh_stale(session, key, bars, stale)
+
+            first = bucket_bounds(period, start)[0] if start is not None else None
+            bars = [
+                bar for period_start, bar in sorted(bars.items())
+                if (first is None or period_start >= first)
+                and (end is None or period_start <= end)
+            ]
+        return [dict(bar, period_start=bar['period_start'].isoformat()) for bar in bars]
+
+    def key_lock(self, key) -> threading.Lock:
+        """The lock serializing queries for one (ticker, period)."""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def invalidate(self, ticker: str, trade_dates) -> None:
+        """Mark the buckets containing ``trade_dates`` as stale for every cached period."""
+        with self._lock:
+            self._invalidate(ticker, trade_dates)
+
+    def clear(self) -> None:
+        """Drop every cached bar."""
+        with self._lock:
+            self._bars.clear()
+            self._built_at.clear()
+            self._stale.clear()
+            self._watermark.clear()
+            self._seen.clear()
+
+    def __len__(self):
+        return len(self._bars)
+
+    def _store(self, key, bars):
+        self._bars[key] = bars
+        self._bars.move_to_end(key)
+        self._built_at[key] = time.monotonic()
+        while len(self._bars) > self.max_entries:
+            evicted, _ = self._bars.popitem(last=False)
+            self._built_at.pop(evicted, None)
+            self._stale.pop(evicted, None)
+            in_use = list(self._bars) + list(self._key_locks.keys())
+            if not any(cached[0] == evicted[0] for cached in in_use):
+                self._watermark.pop(evicted[0], None)
+                self._seen.pop(evicted[0], None)
+
+    def _invalidate(self, ticker, trade_dates):
+        trade_dates = list(trade_dates)
+        for key in self._bars:
+            if key[0] != ticker:
+                continue
+            stale = self._stale.setdefault(key, set())
+            stale.update(bucket_bounds(key[1], day)[0] for day in trade_dates)
+
+    def _absorb_new_rows(self, session, ticker):
+        """Invalidate buckets touched by rows committed since the last call."""
+        # Read the marks before any aggregation so concurrent inserts are
+        # picked up (and at worst re-aggregated) on the next call
+        latest = latest_ids(session)
+        with self._lock:
+            watermark = self._watermark.get(ticker, latest)
+        rows = self._tail_rows(session, ticker, watermark)
+        with self._lock:
+            # Compared at write time so concurrent calls for other periods never lose a row
+            seen = self._seen.get(ticker)
+            self._watermark[ticker] = tuple(map(max, latest, self._watermark.get(ticker, latest)))
+            self._seen[ticker] = {row[:2] for row in rows}
+            if seen is not None:
+                self._invalidate(ticker, {row[2] for row in rows if row[:2] not in seen})
+
+    def _tail_rows(self, session, ticker, watermark):
+        """(daily_metrics.id, fundamentals.id, trade_date) of the ticker's rows near ``watermark``."""
+        query = session.query(DailyMetrics.id, Fundamentals.id, DailyMetrics.trade_date).join(
+            Fundamentals, Fundamentals.daily_metrics_id == DailyMetrics.id
+        ).filter(DailyMetrics.ticker == ticker)
+        return [tuple(row) for row in recent_rows(query, watermark, self.id_margin).all()]
+
+    def _refresh_stale(self, session, key, bars, stale):
+        ticker, period = key
+        bounds = [bucket_bounds(period, period_start) for period_start in stale]
+        try:
+            fresh = {
+                bar['period_start']: bar
+                for bar in aggregate_bars(
+                    session, ticker, period,
+                    start=min(b[0] for b in bounds), end=max(b[1] for b in bounds)
+                )
+            }
+        except Exception:
+            with self._lock:
+                self._stale.setdefault(key, set()).update(stale)
+            raise
+        for period_start in stale:
+            if period_start in fresh:
+                bars[period_start] = fresh[period_start]
+            else:
+                bars.pop(period_start, None)
@@ -0,0 +1,294 @@
+"""In-memory stock screener over a rolling columnar snapshot of the universe.
+
+The snapshot keeps the last ``window_days`` trading days of OHLCV for every
+ticker as ``(days, tickers)`` NumPy arrays and is refreshed incrementally from
+rows committed since the previous refresh. Screens are small expressions such as::
+
+    close > sma(close, 200) and volume > 3 * sma(volume, 20)
+
+which are evaluated as vectorized boolean masks over all tickers at once.
+"""
+
+import ast
+import threading
+import time
+
+import numpy as np
+
+from taro.analysis.watermark import REFRESH_ID_MARGIN, latest_ids, recent_rows
+from taro.db.models import DailyMetrics, Fundamentals
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+_FIELD_COLUMNS = (
+    Fundamentals.open_price,
+    Fundamentals.high_price,
+    Fundamentals.low_price,
+    Fundamentals.close_price,
+    Fundamentals.volume,
+)
+
+DEFAULT_WINDOW_DAYS = 260
+
+# Longest accepted screen expression, in characters
+MAX_EXPRESSION_LENGTH = 1000
+
+# Seconds after which the trailing ids are re-read even if neither table's max id moved
+RECHECK_INTERVAL = 60.0
+
+
+class ScreenExpressionError(ValueError):
+    """Raised when a screen expression is malformed or cannot be evaluated."""
+
+
+class UniverseSnapshot:
+    """Rolling N-day columnar snapshot of every ticker's daily bars."""
+
+    def __init__(self, window_days: int = DEFAULT_WINDOW_DAYS, id_margin: int = REFRESH_ID_MARGIN,
+                 recheck_interval: float = RECHECK_INTERVAL):
+        self.window_days = window_days
+        self.id_margin = id_margin
+        self.recheck_interval = recheck_interval
+        self.dates = np.array([], dtype='datetime64[D]')
+        self.tickers = []
+        self.data = {field: np.empty((0, 0)) for field in FIELDS}
+        self.watermark = None  # (max daily_metrics.id, max fundamentals.id) at the last refresh
+        self._checked_at = 0.0
+        self._ticker_index = {}
+        self._lock = threading.Lock()          # guards the arrays
+        self._refresh_lock = threading.Lock()  # serializes refreshes
+
+    @property
+    def loaded(self) -> bool:
+        """True once the first refresh has completed."""
+        return self.watermark is not None
+
+    def refresh(self, session, blocking: bool = True) -> int:
+        """
+        Pull rows committed since the last refresh into the snapshot.
+
+        Every refresh re-reads the last ``id_margin`` ids of both tables (see
+        :mod:`taro.analysis.watermark`); applying a row twice is harmless.
+        When neither table changed, the re-read happens at most every
+        ``recheck_interval`` seconds.
+        :param session: SQLAlchemy session
+        :param blocking: False returns 0 at once if another refresh is running
+        :return: number of rows read; 0 when nothing changed
+        """
+        if not self._refresh_lock.acquire(blocking=blocking):
+            return 0
+        try:
+            latest = latest_ids(session)
+            now = time.monotonic()
+            if latest == self.watermark and now - self._checked_at < self.recheck_interval:
+                return 0
+            rows = self._fetch_rows(session)
+            with self._lock:
+                self.apply_rows(rows)
+                self.watermark = latest
+                self._checked_at = now
+            return len(rows)
+        finally:
+            self._refresh_lock.release()
+
+    def _fetch_rows(self, session):
+        query = session.query(
+            DailyMetrics.trade_date, DailyMetrics.ticker, *_FIELD_COLUMNS
+        ).join(
+            Fundamentals, Fundamentals.daily_metrics_id == DailyMetrics.id
+        )
+        cutoff = self._cutoff_date(session)
+        if cutoff is not None:
+            query = query.filter(DailyMetrics.trade_date >= cutoff)
+        if self.watermark is None:
+            return query.all()
+        return recent_rows(query, self.watermark, self.id_margin).all()
+
+    def _cutoff_date(self, session):
+        """Oldest trade date that can still fall inside the window."""
+        if self.watermark is not None:
+            return self.dates[0].item() if len(self.dates) >= self.window_days else None
+        return session.query(DailyMetrics.trade_date).distinct().order_by(
+            DailyMetrics.trade_date.desc()
+        ).offset(self.window_days - 1).limit(1).scalar()
+
+    def apply_rows(self, rows) -> None:
+        """Merge (trade_date, ticker, open, high, low, close, volume) rows into the arrays."""
+        if not rows:
+            return
+        trade_dates, tickers, *values = zip(*rows)
+        trade_dates = np.array(trade_dates, dtype='datetime64[D]')
+
+        for ticker in dict.fromkeys(tickers):
+            if ticker not in self._ticker_index:
+                self._ticker_index[ticker] = len(self.tickers)
+                self.tickers.append(ticker)
+
+        dates = np.union1d(self.dates, trade_dates)[-self.window_days:]
+        if len(dates) != len(self.dates) or not np.array_equal(dates, self.dates) \
+                or self.data['close'].shape[1] != len(self.tickers):
+            self._reshape(dates)
+
+        pos = np.searchsorted(self.dates, trade_dates)
+        in_window = pos < len(self.dates)
+        in_window[in_window] = self.dates[pos[in_window]] == trade_dates[in_window]
+        columns = np.fromiter((self._ticker_index[t] for t in tickers), dtype=np.intp, count=len(tickers))
+
+        for field, field_values in zip(FIELDS, values):
+            field_values = np.asarray(field_values, dtype=float)
+            self.data[field][pos[in_window], columns[in_window]] = field_values[in_window]
+
+    def _reshape(self, dates):
+        """Re-lay the arrays onto a new date axis and ticker count, keeping overlapping data."""
+        old_pos = np.searchsorted(dates, self.dates)
+        keep = old_pos < len(dates)
+        keep[keep] = dates[old_pos[keep]] == self.dates[keep]
+
+        for field in FIELDS:
+            old = self.data[field]
+            new = np.full((len(dates), len(self.tickers)), np.nan)
+            new[old_pos[keep], :old.shape[1]] = old[keep]
+            self.data[field] = new
+        self.dates = dates
+
+    def screen(self, expression: str, limit: int | None = None) -> dict:
+        """
+        Evaluate a screen against the latest day of the snapshot.
+        :param expression: e.g. 'close > sma(close, 200) and volume > 3 * sma(volume, 20)'
+        :param limit: maximum number of matches to return
+        :return: dict with the as-of date and matching tickers
+        """
+        if limit is not None and limit < 0:
+            raise ValueError(f"limit must not be negative, got {limit}")
+        tree = _parse(expression)
+        with self._lock:
+            if not len(self.dates):
+                return {'as_of': None, 'count': 0, 'matches': []}
+            mask = _Evaluator(self).evaluate(tree)
+            if np.ndim(mask) == 0 or mask.dtype != bool:
+                raise ScreenExpressionError("Screen expression must be a comparison")
+
+            hits = np.flatnonzero(mask)
+            close = self.data['close'][-1]
+            volume = self.data['volume'][-1]
+            matches = [
+                {'ticker': self.tickers[i], 'close': float(close[i]), 'volume': float(volume[i])}
+                for i in hits[:limit]
+            ]
+            return {'as_of': str(self.dates[-1]), 'count': len(hits), 'matches': matches}
+
+
+def _parse(expression):
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ScreenExpressionError(f"Screen expression longer than {MAX_EXPRESSION_LENGTH} characters")
+    try:
+        return ast.parse(expression, mode='eval').body
+    except SyntaxError as e:
+        raise ScreenExpressionError(f"Invalid screen expression: {e.msg}") from None
+    except (MemoryError, RecursionError, ValueError):
+        raise ScreenExpressionError("Screen expression is too deeply nested") from None
+
+
+class _Evaluator:
+    """Walks a parsed expression, allowing only fields, numbers, operators and window functions."""
+
+    _BINARY = {
+        ast.Add: np.add,
+        ast.Sub: np.subtract,
+        ast.Mult: np.multiply,
+        ast.Div: np.divide,
+    }
+    _COMPARE = {
+        ast.Gt: np.greater,
+        ast.GtE: np.greater_equal,
+        ast.Lt: np.less,
+        ast.LtE: np.less_equal,
+        ast.Eq: np.equal,
+        ast.NotEq: np.not_equal,
+    }
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def evaluate(self, node):
+        try:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return self._eval(node)
+        except RecursionError:
+            raise ScreenExpressionError("Screen expression is too deeply nested") from None
+
+    def _eval(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            return float(node.value)
+        if isinstance(node, ast.Name):
+            return self._field(node)[-1]
+        if isinstance(node, ast.BinOp) and type(node.op) in self._BINARY:
+            return self._BINARY[type(node.op)](self._eval(node.left), self._eval(node.right))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self._eval(node.operand)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return ~self._mask(node.operand)
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return combine.reduce([self._mask(value) for value in node.values])
+        if isinstance(node, ast.Compare):
+            return self._compare(node)
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        raise ScreenExpressionError(f"Unsupported syntax in screen: {ast.unparse(node)!r}")
+
+    def _mask(self, node):
+        value = self._eval(node)
+        if np.ndim(value) == 0 or value.dtype != bool:
+            raise ScreenExpressionError(f"Expected a comparison, got {ast.unparse(node)!r}")
+        return value
+
+    def _compare(self, node):
+        masks = []
+        left = self._eval(node.left)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in self._COMPARE:
+                raise ScreenExpressionError(f"Unsupported comparison in {ast.unparse(node)!r}")
+            right = self._eval(comparator)
+            masks.append(self._COMPARE[type(op)](left, right))
+            left = right
+        return np.logical_and.reduce(masks)
+
+    def _field(self, node):
+        if not isinstance(node, ast.Name) or node.id not in FIELDS:
+            raise ScreenExpressionError(
+                f"Unknown field {ast.unparse(node)!r}; use one of {', '.join(FIELDS)}"
+            )
+        return self.snapshot.data[node.id]
+
+    def _call(self, node):
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name not in _WINDOW_FUNCTIONS or len(node.args) != 2 or node.keywords:
+            raise ScreenExpressionError(
+                f"Unsupported function call {ast.unparse(node)!r}; "
+                f"use {', '.join(f'{f}(field, days)' for f in _WINDOW_FUNCTIONS)}"
+            )
+        values = self._field(node.args[0])
+        window = node.args[1]
+        if not (isinstance(window, ast.Constant) and type(window.value) is int and window.value > 0):
+            raise ScreenExpressionError(f"Window in {ast.unparse(node)!r} must be a positive integer")
+
+        needed = window.value + (1 if name in ('change', 'prev') else 0)
+        if needed > len(values):
+            raise ScreenExpressionError(
+                f"{ast.unparse(node)} needs {needed} days of history, "
+                f"snapshot holds {len(values)}"
+            )
+        return _WINDOW_FUNCTIONS[name](values, window.value)
+
+
+# Window functions take (days, tickers) values and return one value per ticker.
+# Any missing bar inside the window yields NaN, which never passes a comparison.
+_WINDOW_FUNCTIONS = {
+    'sma': lambda values, n: values[-n:].mean(axis=0),
+    'highest': lambda values, n: values[-n:].max(axis=0),
+    'lowest': lambda values, n: values[-n:].min(axis=0),
+    'prev': lambda values, n: values[-1 - n],
+    'change': lambda values, n: values[-1] / values[-1 - n] - 1.0,
+}
@@ -0,0 +1,34 @@
+"""High-water marks for picking up newly committed daily bars.
+
+Ids are allocated on insert but become visible on commit, so a lower id can
+appear after a higher one, and a fundamentals row can commit after its
+daily_metrics row. Readers therefore keep the max ids of both tables and
+re-read the last ``margin`` ids of each on every pass.
+"""
+
+from sqlalchemy import func, select
+
+from taro.db.models import DailyMetrics, Fundamentals
+
+# Trailing ids of each table re-read on every pass, for rows committed out of id order
+REFRESH_ID_MARGIN = 1000
+
+
+def latest_ids(session) -> tuple[int, int]:
+    """(max daily_metrics.id, max fundamentals.id), 0 for an empty table."""
+    return tuple(session.query(
+        select(func.coalesce(func.max(DailyMetrics.id), 0)).scalar_subquery(),
+        select(func.coalesce(func.max(Fundamentals.id), 0)).scalar_subquery(),
+    ).one())
+
+
+def recent_rows(query, watermark: tuple[int, int], margin: int = REFRESH_ID_MARGIN):
+    """
+    Restrict a daily_metrics/fundamentals join to rows within ``margin`` ids of ``watermark`` or above.
+    :param query: query joining DailyMetrics and Fundamentals
+    :param watermark: marks from an earlier :func:`latest_ids`
+    :return: the union of both id ranges, as a query
+    """
+    metrics_low, fundamentals_low = (mark - margin for mark in watermark)
+    # Two index range scans rather than one OR that would scan both tables
+    return query.filter(DailyMetrics.id > metrics_low).union(query.filter(Fundamentals.id > fundamentals_low))
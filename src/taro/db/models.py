@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Numeric, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, DateTime, Numeric, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import declarative_base
 
@@ -22,3 +22,15 @@ class Fundamentals(Base):
     low_price = Column(Numeric(10, 2), nullable=False)
     volume = Column(Numeric(10, 2), nullable=False)
     daily_metrics = relationship("DailyMetrics", back_populates="fundamentals")
+
+class IntradayBars(Base):
+    __tablename__ = "intraday_bars"
+    # Range-partitioned by month on bar_time; partitions are named intraday_bars_<suffix>
+    __table_args__ = {"postgresql_partition_by": "RANGE (bar_time)"}
+    ticker = Column(String(10), primary_key=True)
+    bar_time = Column(DateTime(timezone=True), primary_key=True)  # start of the 1-minute bar
+    open_price = Column(Numeric(10, 2), nullable=False)
+    high_price = Column(Numeric(10, 2), nullable=False)
+    close_price = Column(Numeric(10, 2), nullable=False)
+    low_price = Column(Numeric(10, 2), nullable=False)
+    volume = Column(Numeric(12, 2), nullable=False)
@@ -3,6 +3,13 @@ from datetime import datetime, timedelta
 
 
 class YFinanceFetcher:
+    def __init__(self, download=None):
+        """
+        :param download: callable with the signature of yf.download; defaults to yf.download.
+            Tests pass a taro.fetcher.replay downloader to run offline.
+        """
+        self._download = download or yf.download
+
     def fetch_by_date(self, ticker: str, date: str) -> dict | None:
         """
         Fetch the market data for a specific stock on a given day.
@@ -16,7 +23,7 @@ class YFinanceFetcher:
             next_day = (date_obj + timedelta(days=1)).strftime("%Y-%m-%d")
             # progress=False disables the download progress print
             # auto_adjust=True returns adjusted (total return) prices, accounting for splits/dividends
-            df = yf.download(
+            df = self._download(
                 ticker, start=date, end=next_day, progress=False, auto_adjust=True
             )
 
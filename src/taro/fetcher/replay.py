@@ -0,0 +1,147 @@
+"""Record/replay stand-ins for ``yf.download`` so fetcher tests run offline.
+
+``RecordingDownloader`` calls Yahoo and saves each response as a small JSON
+fixture; ``ReplayDownloader`` serves those fixtures back deterministically,
+optionally with injected latency and failures. Both are drop-in ``download``
+callables for :class:`~taro.fetcher.fetcher_yfinance.YFinanceFetcher`::
+
+    fetcher = YFinanceFetcher(download=ReplayDownloader('tests/fixtures/yfinance'))
+
+Fixtures written by hand rather than recorded carry ``"synthetic": true``;
+recording the same call again replaces them with the real response.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import yfinance as yf
+
+# Keyword arguments that change the response and therefore belong in the fixture key
+_KEYED_KWARGS = ('auto_adjust', 'interval', 'actions', 'prepost', 'repair')
+
+# yf.download defaults, omitted from the key so fixtures stay readable
+_DEFAULTS = {'auto_adjust': True, 'interval': '1d', 'actions': False, 'prepost': False, 'repair': False}
+
+
+class FixtureNotFoundError(LookupError):
+    """Raised when no recorded response exists for a replayed call."""
+
+
+class InjectedFailure(ConnectionError):
+    """Raised by ReplayDownloader to simulate a failed request."""
+
+
+def fixture_name(tickers, start=None, end=None, **kwargs) -> str:
+    """File name identifying one download call, e.g. 'GOOGL_2025-03-10_2025-03-11.json'."""
+    if not isinstance(tickers, str):
+        tickers = '-'.join(tickers)
+    name = re.sub(r'[^A-Za-z0-9._^=-]+', '-', f"{tickers}_{start}_{end}")
+    keyed = {k: kwargs[k] for k in _KEYED_KWARGS if k in kwargs and kwargs[k] != _DEFAULTS.get(k)}
+    if keyed:
+        digest = hashlib.sha1(json.dumps(keyed, sort_keys=True, default=str).encode()).hexdigest()[:8]
+        name = f"{name}_{digest}"
+    return f"{name}.json"
+
+
+def dump_frame(df: pd.DataFrame) -> dict:
+    """Serialize a download result, keeping its (possibly multi-level) columns and index."""
+    multi = isinstance(df.columns, pd.MultiIndex)
+    return {
+        'index_name': df.index.name,
+        'index': [ts.isoformat() for ts in df.index],
+        'column_names': list(df.columns.names),
+        'columns': [list(c) if multi else [c] for c in df.columns],
+        # NaN is not valid JSON; object dtype keeps the None that replaces it
+        'data': df.astype(float).astype(object).where(df.notna(), None).values.tolist(),
+    }
+
+
+def load_frame(payload: dict) -> pd.DataFrame:
+    """Inverse of :func:`dump_frame`."""
+    names = payload['column_names']
+    if len(names) > 1:
+        columns = pd.MultiIndex.from_tuples([tuple(c) for c in payload['columns']], names=names)
+    else:
+        columns = pd.Index([c[0] for c in payload['columns']], name=names[0] if names else None)
+    index = pd.DatetimeIndex(pd.to_datetime(payload['index']), name=payload['index_name'])
+    return pd.DataFrame(payload['data'] or None, index=index, columns=columns, dtype=float)
+
+
+class RecordingDownloader:
+    """Calls the real downloader and saves every response as a fixture."""
+
+    def __init__(self, fixture_dir, download=None):
+        self.fixture_dir = Path(fixture_dir)
+        self._download = download or yf.download
+
+    def __call__(self, tickers, start=None, end=None, **kwargs):
+        df = self._download(tickers, start=start, end=end, **kwargs)
+        if df is not None:
+            self.fixture_dir.mkdir(parents=True, exist_ok=True)
+            path = self.fixture_dir / fixture_name(tickers, start, end, **kwargs)
+            path.write_text(json.dumps(dump_frame(df), separators=(',', ':')) + '\n')
+        return df
+
+
+class ReplayDownloader:
+    """Serves recorded fixtures, with optional simulated latency and failures.
+
+    Safe to share between threads; with a fixed ``seed`` the sequence of
+    injected delays and failures is reproducible.
+    :param fixture_dir: directory written by RecordingDownloader
+    :param latency: seconds added to every call
+    :param jitter: extra uniformly random seconds, 0..jitter
+    :param failure_rate: probability that a call raises InjectedFailure
+    :param fail_tickers: tickers whose calls always raise InjectedFailure
+    :param seed: random seed for jitter and failures
+    """
+
+    def __init__(self, fixture_dir, latency: float = 0.0, jitter: float = 0.0,
+                 failure_rate: float = 0.0, fail_tickers=(), seed: int | None = 0):
+        self.fixture_dir = Path(fixture_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.fail_tickers = set(fail_tickers)
+        self.calls = 0
+        self.failures = 0
+        self.misses = []
+        self._random = random.Random(seed)
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, tickers, start=None, end=None, **kwargs):
+        name = fixture_name(tickers, start, end, **kwargs)
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter) if self.jitter else self.latency
+            fail = self._random.random() < self.failure_rate \
+                or (isinstance(tickers, str) and tickers in self.fail_tickers)
+
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.failures += 1
+            raise InjectedFailure(f"Injected failure for {name}")
+        return self._load(name).copy()
+
+    def _load(self, name):
+        with self._lock:
+            if name in self._frames:
+                return self._frames[name]
+        path = self.fixture_dir / name
+        if not path.exists():
+            with self._lock:
+                self.misses.append(name)
+            raise FixtureNotFoundError(f"No recorded response {path}; record it with TARO_YF_MODE=record")
+        frame = load_frame(json.loads(path.read_text()))
+        with self._lock:
+            self._frames[name] = frame
+        return frame
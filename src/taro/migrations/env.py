@@ -7,6 +7,7 @@ from alembic import context
 
 # Import models from db/models
 from taro.db.models import Base
+from taro.migrations.toolkit import PROGRESS_TABLE, is_dry_run
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -19,6 +20,12 @@ if config.config_file_name is not None:
 # Use db models metadata for unified schema
 target_metadata = Base.metadata
 
+# Partitions of these tables exist only in the database (named <table>_<suffix>)
+partitioned_tables = {
+    table.name for table in target_metadata.tables.values()
+    if table.dialect_options["postgresql"].get("partition_by")
+}
+
 
 def get_database_url():
     """Get PostgreSQL database URL from environment variables.
@@ -40,6 +47,16 @@ def get_database_url():
     return f"postgresql://{user}:{password}@{host}:{port}/{name}"
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep toolkit bookkeeping tables and partitions out of autogenerate and ``alembic check``."""
+    if type_ == "table" and reflected and name not in target_metadata.tables:
+        if name == PROGRESS_TABLE:
+            return False
+        if any(name.startswith(f"{parent}_") for parent in partitioned_tables):
+            return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode."""
     url = get_database_url()
@@ -48,7 +65,9 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
-        include_schemas=True
+        include_schemas=True,
+        include_object=include_object,
+        transaction_per_migration=True
     )
 
     with context.begin_transaction():
@@ -67,15 +86,30 @@ def run_migrations_online():
         poolclass=pool.NullPool,
     )
 
+    dry_run = is_dry_run()
+
     with connectable.connect() as connection:
+        # Commit each revision separately so locks taken by one revision are
+        # released before the next starts; dry runs need a single transaction
+        # so everything can be rolled back
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
-            include_schemas=True
+            include_schemas=True,
+            include_object=include_object,
+            transaction_per_migration=not dry_run
         )
 
-        with context.begin_transaction():
-            context.run_migrations()
+        if dry_run:
+            # Toolkit helpers only log estimates; roll back everything else
+            transaction = connection.begin()
+            try:
+                context.run_migrations()
+            finally:
+                transaction.rollback()
+        else:
+            with context.begin_transaction():
+                context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,348 @@
+"""Helpers for revisions that touch large tables without long blocking locks.
+
+Use them from ``upgrade()``/``downgrade()`` in ``migrations/versions``::
+
+    from taro.migrations.toolkit import batched_backfill, create_index_concurrently
+
+    def upgrade():
+        # Idempotent: a resumed upgrade re-runs it after it was already committed
+        op.execute('ALTER TABLE fundamentals ADD COLUMN IF NOT EXISTS vwap numeric(10, 2)')
+        batched_backfill(
+            'fundamentals_vwap', 'fundamentals',
+            set_sql='vwap = (high_price + low_price + close_price) / 3',
+            where_sql='vwap IS NULL',
+        )
+        create_index_concurrently('ix_daily_metrics_ticker', 'daily_metrics', ['ticker'])
+
+The backfill and index helpers commit the revision's transaction before they
+start, while ``alembic_version`` only advances once the whole revision
+finishes. Anything before them in the same revision therefore runs again
+when an interrupted upgrade is resumed, so it must be idempotent (``IF NOT
+EXISTS``) or live in an earlier revision.
+
+Run ``alembic -x dry_run=true upgrade head`` to log row and time estimates
+instead of building indexes or writing backfills; the rest of the revision
+runs in a transaction that is rolled back.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+
+from alembic import context, op
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+log = logging.getLogger('alembic.' + __name__)
+
+# Resumable backfills checkpoint here; env.py keeps it out of autogenerate
+PROGRESS_TABLE = 'taro_migration_progress'
+
+# Throughput assumed by the dry-run estimator for a single-row-per-key UPDATE
+ASSUMED_ROWS_PER_SECOND = 20000
+
+# Heap bytes per second assumed by the dry-run estimator for an index build;
+# CREATE INDEX CONCURRENTLY reads the table twice
+ASSUMED_INDEX_BYTES_PER_SECOND = 50_000_000
+
+# SQLSTATE for lock_not_available, raised when lock_timeout expires
+_LOCK_NOT_AVAILABLE = '55P03'
+
+_TIMEOUT = re.compile(r'^[0-9]+\s*(us|ms|s|min|h|d)?$')
+
+
+def is_dry_run() -> bool:
+    """True when alembic was invoked with ``-x dry_run=true``."""
+    try:
+        x_args = context.get_x_argument(as_dictionary=True)
+    except NameError:  # not running inside env.py
+        return False
+    return x_args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+
+
+def _check_timeout(timeout):
+    if not _TIMEOUT.match(str(timeout)):
+        raise ValueError(f"Invalid timeout {timeout!r}, expected e.g. '500ms', '5s' or '1min'")
+    return str(timeout)
+
+
+def _quote(name):
+    preparer = op.get_bind().dialect.identifier_preparer
+    return '.'.join(preparer.quote(part) for part in name.split('.'))
+
+
+def _is_lock_timeout(error):
+    return getattr(error.orig, 'sqlstate', None) == _LOCK_NOT_AVAILABLE \
+        or getattr(error.orig, 'pgcode', None) == _LOCK_NOT_AVAILABLE
+
+
+@contextmanager
+def lock_timeout(timeout: str = '5s', statement_timeout: str | None = None):
+    """
+    Bound how long statements in the current transaction wait for locks.
+
+    A DDL statement queued behind a long-running query blocks every later
+    query on the table, so it is better to fail fast and retry.
+    :param timeout: PostgreSQL interval, e.g. '5s'
+    :param statement_timeout: optional cap on each statement's run time
+    """
+    op.execute(f"SET LOCAL lock_timeout = '{_check_timeout(timeout)}'")
+    if statement_timeout is not None:
+        op.execute(f"SET LOCAL statement_timeout = '{_check_timeout(statement_timeout)}'")
+    try:
+        yield
+    finally:
+        if not context.is_offline_mode() and op.get_bind().in_transaction():
+            op.execute('SET LOCAL lock_timeout TO DEFAULT')
+            if statement_timeout is not None:
+                op.execute('SET LOCAL statement_timeout TO DEFAULT')
+
+
+def estimate_table(table_name: str) -> dict:
+    """
+    Planner row estimate and on-disk size of a table, without scanning it.
+
+    A table that was never analyzed has no row estimate (``reltuples`` is -1,
+    or 0 with data pages before PostgreSQL 14); its rows are counted instead,
+    with a warning.
+    :return: dict with 'rows', 'bytes' (including indexes and TOAST), 'heap_bytes' and 'analyzed'
+    """
+    estimate = _table_statistics(table_name)
+    if estimate['rows'] is None:
+        estimate['rows'] = _count_unanalyzed(table_name)
+    return estimate
+
+
+def _table_statistics(table_name):
+    row = op.get_bind().execute(text(
+        "SELECT c.reltuples::bigint, c.relpages, pg_relation_size(c.oid), pg_total_relation_size(c.oid) "
+        "FROM pg_class c WHERE c.oid = to_regclass(:table)"
+    ), {'table': table_name}).first()
+    if row is None:
+        return {'rows': 0, 'bytes': 0, 'heap_bytes': 0, 'analyzed': False}
+    rows, pages, heap_bytes, total_bytes = row
+    analyzed = rows >= 0 and not (pages == 0 and heap_bytes > 0)
+    return {'rows': rows if analyzed else None, 'bytes': total_bytes, 'heap_bytes': heap_bytes,
+            'analyzed': analyzed}
+
+
+def _count_unanalyzed(table_name, where_sql=None):
+    log.warning("%s has no planner statistics, counting its rows instead; "
+                "run ANALYZE %s for estimates without a scan", table_name, table_name)
+    where = f" WHERE {where_sql}" if where_sql else ''
+    return op.get_bind().execute(text(f"SELECT count(*) FROM {_quote(table_name)}{where}")).scalar()
+
+
+def estimate_index(table_name: str, bytes_per_second: int = ASSUMED_INDEX_BYTES_PER_SECOND) -> dict:
+    """
+    Estimate rows, table size and build time of :func:`create_index_concurrently`.
+
+    The time assumes both table scans of a concurrent build run at
+    ``bytes_per_second``; waits for older transactions are not included.
+    :return: dict with 'rows', 'bytes' and 'seconds'
+    """
+    estimate = estimate_table(table_name)
+    return {
+        'rows': estimate['rows'],
+        'bytes': estimate['bytes'],
+        'seconds': round(2 * estimate['heap_bytes'] / bytes_per_second, 1),
+    }
+
+
+def estimate_backfill(table_name: str, where_sql: str | None = None, key: str = 'id',
+                      batch_size: int = 10000, pause: float = 0.1,
+                      rows_per_second: int = ASSUMED_ROWS_PER_SECOND) -> dict:
+    """
+    Estimate rows, batches and wall time of :func:`batched_backfill` without writing.
+
+    Matching rows come from the planner; without statistics its selectivity
+    is a guess, so the rows matching ``where_sql`` are counted instead.
+    :return: dict with 'rows', 'batches' and 'seconds'
+    """
+    bind = op.get_bind()
+    table, key_col = _quote(table_name), _quote(key)
+    rows = _table_statistics(table_name)['rows']
+    if rows is None:
+        rows = _count_unanalyzed(table_name, where_sql)
+    elif where_sql:
+        plan = bind.execute(text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {table} WHERE {where_sql}")).scalar()
+        rows = int(plan[0]['Plan']['Plan Rows'])
+
+    low, high = bind.execute(text(f"SELECT min({key_col}), max({key_col}) FROM {table}")).first()
+    batches = 0 if low is None else (high - low) // batch_size + 1
+    return {
+        'rows': rows,
+        'batches': batches,
+        'seconds': round(rows / rows_per_second + batches * pause, 1),
+    }
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: list, unique: bool = False,
+                              timeout: str | None = None, retries: int = 3, backoff: float = 5.0,
+                              **kw) -> None:
+    """
+    ``CREATE INDEX CONCURRENTLY`` outside the revision's transaction.
+
+    An invalid index left behind by an earlier failed build is dropped first.
+    No lock_timeout is set by default: a concurrent build also waits on the
+    virtual transaction ids of every older transaction in its later phases,
+    and lock_timeout applies to those waits, so a single long-running query
+    would abort a build that may have scanned the table for hours. The build
+    only holds SHARE UPDATE EXCLUSIVE, which doesn't block reads or writes.
+    With a ``timeout``, a build that cannot get its lock in time is retried.
+    :param index_name: e.g. 'ix_daily_metrics_ticker'
+    :param table_name: e.g. 'daily_metrics'
+    :param columns: column names or expressions
+    :param timeout: optional lock_timeout for each attempt
+    :param retries: extra attempts after a lock timeout
+    :param backoff: seconds to wait between attempts
+    """
+    if is_dry_run():
+        estimate = estimate_index(table_name)
+        log.info("[dry-run] would create index %s on %s (~%d rows, %.1f MB, ~%.0fs)",
+                 index_name, table_name, estimate['rows'], estimate['bytes'] / 1e6, estimate['seconds'])
+        return
+
+    if timeout is not None:
+        timeout = _check_timeout(timeout)
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            op.create_index(index_name, table_name, columns, unique=unique,
+                            postgresql_concurrently=True, if_not_exists=True, **kw)
+            return
+
+        for attempt in range(retries + 1):
+            _drop_invalid_index(index_name)
+            if timeout is not None:
+                op.execute(f"SET lock_timeout = '{timeout}'")
+            try:
+                op.create_index(index_name, table_name, columns, unique=unique,
+                                postgresql_concurrently=True, if_not_exists=True, **kw)
+                return
+            except DBAPIError as e:
+                if not _is_lock_timeout(e) or attempt == retries:
+                    raise
+                log.warning("Lock timeout building %s (attempt %d/%d), retrying in %.0fs",
+                            index_name, attempt + 1, retries + 1, backoff)
+                time.sleep(backoff)
+            finally:
+                if timeout is not None:
+                    op.execute('RESET lock_timeout')
+
+
+def drop_index_concurrently(index_name: str, table_name: str | None = None, timeout: str = '5s') -> None:
+    """``DROP INDEX CONCURRENTLY IF EXISTS`` outside the revision's transaction."""
+    if is_dry_run():
+        log.info("[dry-run] would drop index %s", index_name)
+        return
+    timeout = _check_timeout(timeout)
+    with op.get_context().autocommit_block():
+        op.execute(f"SET lock_timeout = '{timeout}'")
+        try:
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+        finally:
+            op.execute('RESET lock_timeout')
+
+
+def _drop_invalid_index(index_name):
+    invalid = op.get_bind().execute(text(
+        "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(:name) AND NOT indisvalid"
+    ), {'name': index_name}).first()
+    if invalid:
+        log.info("Dropping invalid index %s left by an interrupted build", index_name)
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_quote(index_name)}")
+
+
+def batched_backfill(name: str, table_name: str, set_sql: str, where_sql: str | None = None,
+                     key: str = 'id', batch_size: int = 10000, pause: float = 0.1,
+                     timeout: str = '2s') -> int:
+    """
+    Run ``UPDATE table SET ...`` in committed key-range batches.
+
+    Each batch is a single statement that updates one ``key`` range and
+    advances the checkpoint for ``name`` in :data:`PROGRESS_TABLE`, so an
+    interrupted backfill resumes after the last committed batch. ``where_sql``
+    should exclude rows that are already done (e.g. ``col IS NULL``). Rows
+    inserted after the backfill starts are expected to be written by the new
+    application code. Statements earlier in the revision are committed first
+    and re-run on resume, so they must be idempotent (see the module docstring).
+    :param name: unique checkpoint name, e.g. 'fundamentals_vwap'
+    :param table_name: table to update; ``key`` must be an integer column
+    :param set_sql: SQL for the SET clause
+    :param where_sql: optional extra filter
+    :param batch_size: width of each key range
+    :param pause: seconds to sleep between batches to leave I/O for live traffic
+    :param timeout: lock_timeout for each batch
+    :return: number of rows updated by this run
+    """
+    table, key_col = _quote(table_name), _quote(key)
+    condition = f" AND ({where_sql})" if where_sql else ''
+
+    if context.is_offline_mode():
+        log.warning("Offline mode: emitting backfill %s as a single UPDATE", name)
+        op.execute(f"UPDATE {table} SET {set_sql}" + (f" WHERE {where_sql}" if where_sql else ''))
+        return 0
+
+    if is_dry_run():
+        estimate = estimate_backfill(table_name, where_sql, key=key, batch_size=batch_size, pause=pause)
+        log.info("[dry-run] backfill %s on %s: ~%d rows in %d batches, ~%.0fs",
+                 name, table_name, estimate['rows'], estimate['batches'], estimate['seconds'])
+        return 0
+
+    timeout = _check_timeout(timeout)
+    updated = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        bind.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} ("
+            "name text PRIMARY KEY, last_key bigint NOT NULL, rows_done bigint NOT NULL DEFAULT 0, "
+            "updated_at timestamptz NOT NULL DEFAULT now())"
+        ))
+        low, high = bind.execute(text(f"SELECT min({key_col}), max({key_col}) FROM {table}")).first()
+        if low is None:
+            return 0
+        checkpoint = bind.execute(text(
+            f"SELECT last_key FROM {PROGRESS_TABLE} WHERE name = :name"
+        ), {'name': name}).scalar()
+        start = low - 1 if checkpoint is None else checkpoint
+        if start >= high:
+            log.info("Backfill %s already complete", name)
+            return 0
+        if checkpoint is not None:
+            log.info("Resuming backfill %s after %s = %d", name, key, checkpoint)
+
+        bind.execute(text(f"SET lock_timeout = '{timeout}'"))
+        try:
+            started = time.monotonic()
+            while start < high:
+                end = min(start + batch_size, high)
+                updated += bind.execute(text(
+                    f"WITH batch AS ("
+                    f"  UPDATE {table} SET {set_sql}"
+                    f"  WHERE {key_col} > :start AND {key_col} <= :end{condition} RETURNING 1"
+                    f") INSERT INTO {PROGRESS_TABLE} (name, last_key, rows_done) "
+                    f"SELECT :name, :end, count(*) FROM batch "
+                    f"ON CONFLICT (name) DO UPDATE SET last_key = EXCLUDED.last_key, "
+                    f"rows_done = {PROGRESS_TABLE}.rows_done + EXCLUDED.rows_done, updated_at = now() "
+                    f"RETURNING (SELECT count(*) FROM batch)"
+                ), {'name': name, 'start': start, 'end': end}).scalar()
+                start = end
+
+                done = (start - low + 1) / (high - low + 1)
+                log.info("Backfill %s: %.1f%% (%s <= %d), %d rows, %.0fs elapsed",
+                         name, done * 100, key, start, updated, time.monotonic() - started)
+                if pause and start < high:
+                    time.sleep(pause)
+        finally:
+            bind.execute(text('RESET lock_timeout'))
+    return updated
+
+
+def reset_backfill(name: str) -> None:
+    """Forget the checkpoint of a backfill, e.g. from ``downgrade()``."""
+    if context.is_offline_mode() or is_dry_run():
+        return
+    bind = op.get_bind()
+    if bind.execute(text("SELECT to_regclass(:table)"), {'table': PROGRESS_TABLE}).scalar():
+        bind.execute(text(f"DELETE FROM {PROGRESS_TABLE} WHERE name = :name"), {'name': name})
@@ -0,0 +1,344 @@
+"""Intraday 1-minute bar ingestion for a watchlist.
+
+Bars from an :class:`IntradayProvider` land in per-ticker NumPy ring buffers
+that answer "latest N minutes" queries from memory, and are written to the
+partitioned ``intraday_bars`` table in periodic batches. Repeated updates of
+the same minute are coalesced before a flush, so the database sees at most
+one row per ticker-minute and one INSERT statement per flush, however many
+ticks the provider delivers.
+"""
+
+import csv
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, time as dtime, timezone
+from typing import Iterable, Iterator, NamedTuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+
+from taro.db.models import IntradayBars
+
+log = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo('America/New_York')
+MARKET_OPEN = dtime(9, 30)
+MARKET_CLOSE = dtime(16, 0)
+SESSION_MINUTES = 390
+
+# SQLSTATE check_violation: CREATE ... PARTITION OF fails this way when the
+# default partition already holds rows for the new partition's range
+_DEFAULT_PARTITION_CONFLICT = '23514'
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class MinuteBar(NamedTuple):
+    ticker: str
+    bar_time: datetime  # timezone-aware start of the minute
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+def in_market_hours(bar_time: datetime) -> bool:
+    """True for regular US trading hours, Monday to Friday (holidays are not excluded)."""
+    local = bar_time.astimezone(MARKET_TZ)
+    return local.weekday() < 5 and MARKET_OPEN <= local.time() < MARKET_CLOSE
+
+
+class IntradayProvider(ABC):
+    """Source of minute bars, in time order per ticker."""
+
+    @abstractmethod
+    def bars(self) -> Iterator[MinuteBar]:
+        """Yield bars until the feed ends or :meth:`close` is called."""
+
+    def close(self) -> None:
+        """Stop the feed."""
+
+
+class ReplayProvider(IntradayProvider):
+    """Replays recorded minute bars, optionally paced against their timestamps.
+
+    :param bars: recorded bars in time order
+    :param speed: None replays as fast as possible; 1.0 in real time; 60.0 one hour per minute
+    """
+
+    def __init__(self, bars: Iterable[MinuteBar], speed: float | None = None):
+        self._bars = bars
+        self.speed = speed
+        self._closed = threading.Event()
+
+    @classmethod
+    def from_csv(cls, path, speed: float | None = None) -> 'ReplayProvider':
+        """Load bars from a CSV with columns ticker,bar_time,open,high,low,close,volume."""
+        bars = []
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                bar_time = datetime.fromisoformat(row['bar_time'])
+                if bar_time.tzinfo is None:
+                    bar_time = bar_time.replace(tzinfo=timezone.utc)
+                bars.append(MinuteBar(
+                    row['ticker'], bar_time, *(float(row[field]) for field in BAR_FIELDS)
+                ))
+        return cls(bars, speed=speed)
+
+    def bars(self) -> Iterator[MinuteBar]:
+        previous = None
+        for bar in self._bars:
+            if self._closed.is_set():
+                return
+            if self.speed and previous is not None:
+                delay = (bar.bar_time - previous).total_seconds() / self.speed
+                if delay > 0 and self._closed.wait(delay):
+                    return
+            previous = bar.bar_time
+            yield bar
+
+    def close(self) -> None:
+        self._closed.set()
+
+
+class RingBuffer:
+    """Fixed-capacity minute bars for one ticker; the oldest bar is overwritten when full."""
+
+    def __init__(self, capacity: int = SESSION_MINUTES):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.int64)  # epoch seconds
+        self.values = np.zeros((capacity, len(BAR_FIELDS)))
+        self.size = 0
+        self._next = 0
+
+    def append(self, epoch: int, values) -> bool:
+        """Store a bar; a repeat of the newest minute replaces it. Returns False for stale bars."""
+        if self.size:
+            last = (self._next - 1) % self.capacity
+            if epoch == self.times[last]:
+                self.values[last] = values
+                return True
+            if epoch < self.times[last]:
+                return False
+        self.times[self._next] = epoch
+        self.values[self._next] = values
+        self._next = (self._next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return True
+
+    def latest(self, n: int) -> tuple[np.ndarray, np.ndarray]:
+        """The newest ``n`` bars, oldest first, as (times, values) copies."""
+        n = max(0, min(n, self.size))
+        idx = (self._next - n + np.arange(n)) % self.capacity
+        return self.times[idx], self.values[idx]
+
+
+class IntradayIngestor:
+    """Feeds provider bars into ring buffers and flushes them to ``intraday_bars`` in batches.
+
+    :param provider: bar source
+    :param Session: sessionmaker used for flushes
+    :param watchlist: tickers to keep; other bars are dropped
+    :param capacity: minutes kept in memory per ticker
+    :param flush_interval: seconds between background flushes
+    :param max_pending: flush early once this many ticker-minutes are waiting
+    :param max_backlog: most ticker-minutes kept waiting while flushes fail; newer ones are dropped
+    :param market_hours_only: drop bars outside regular trading hours
+    """
+
+    def __init__(self, provider: IntradayProvider, Session, watchlist: Iterable[str],
+                 capacity: int = SESSION_MINUTES, flush_interval: float = 5.0,
+                 max_pending: int = 10000, max_backlog: int = 100000,
+                 market_hours_only: bool = True):
+        self.provider = provider
+        self.Session = Session
+        self.buffers = {ticker: RingBuffer(capacity) for ticker in watchlist}
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_backlog = max(max_backlog, max_pending)
+        self.market_hours_only = market_hours_only
+        self.dropped = 0  # ticker-minutes never written because the backlog was full
+
+        self._pending = {}  # (ticker, bar_time) -> MinuteBar, newest update wins
+        self._partitions = set()
+        self._retry_at = 0.0  # monotonic time before which early flushes are skipped
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def on_bar(self, bar: MinuteBar) -> bool:
+        """Accept one bar; returns False if it was filtered out."""
+        buffer = self.buffers.get(bar.ticker)
+        if buffer is None or (self.market_hours_only and not in_market_hours(bar.bar_time)):
+            return False
+
+        key = (bar.ticker, bar.bar_time)
+        with self._lock:
+            if not buffer.append(int(bar.bar_time.timestamp()), bar[2:]):
+                return False
+            if key in self._pending or len(self._pending) < self.max_backlog:
+                self._pending[key] = bar
+            else:
+                self.dropped += 1
+            full = len(self._pending) >= self.max_pending and time.monotonic() >= self._retry_at
+        if full:
+            try:
+                self.flush()
+            except Exception:
+                # Back off so a database outage doesn't turn every bar into a failing flush
+                self._retry_at = time.monotonic() + self.flush_interval
+                log.exception("Early intraday flush failed; %d ticker-minutes waiting", len(self._pending))
+        return True
+
+    def latest(self, ticker: str, minutes: int) -> dict:
+        """
+        Bars from the last ``minutes`` minutes up to the newest bar of ``ticker``, from memory.
+        :raises KeyError: if ``ticker`` is not on the watchlist
+        """
+        buffer = self.buffers.get(ticker)
+        if buffer is None:
+            raise KeyError(f"{ticker} is not on the intraday watchlist")
+        with self._lock:
+            times, values = buffer.latest(minutes)
+        if len(times):
+            recent = times > times[-1] - minutes * 60
+            times, values = times[recent], values[recent]
+        return {
+            'ticker': ticker,
+            'bar_time': times.astype('datetime64[s]'),
+            **{field: values[:, i] for i, field in enumerate(BAR_FIELDS)},
+        }
+
+    def flush(self) -> int:
+        """Write all pending bars with one upsert; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            session = None
+            try:
+                self.ensure_partitions({bar.bar_time for bar in pending.values()})
+                session = self.Session()
+                session.execute(self._upsert_statement(), self._rows(pending))
+                session.commit()
+            except Exception:
+                if session is not None:
+                    session.rollback()
+                self._requeue(pending)
+                raise
+            finally:
+                if session is not None:
+                    session.close()
+            return len(pending)
+
+    def _requeue(self, pending):
+        """Put a failed batch back, unless newer updates for the same minute arrived meanwhile."""
+        with self._lock:
+            for key, bar in pending.items():
+                if key in self._pending:
+                    continue
+                if len(self._pending) < self.max_backlog:
+                    self._pending[key] = bar
+                else:
+                    self.dropped += 1
+
+    @staticmethod
+    def _rows(pending):
+        return [
+            {
+                'ticker': bar.ticker,
+                'bar_time': bar.bar_time,
+                'open_price': bar.open,
+                'high_price': bar.high,
+                'low_price': bar.low,
+                'close_price': bar.close,
+                'volume': bar.volume,
+            }
+            for bar in pending.values()
+        ]
+
+    @staticmethod
+    def _upsert_statement():
+        stmt = insert(IntradayBars)
+        return stmt.on_conflict_do_update(
+            index_elements=[IntradayBars.ticker, IntradayBars.bar_time],
+            set_={
+                column: stmt.excluded[column]
+                for column in ('open_price', 'high_price', 'low_price', 'close_price', 'volume')
+            },
+        )
+
+    def ensure_partitions(self, bar_times: Iterable[datetime]) -> None:
+        """Create the monthly partitions covering ``bar_times`` if they don't exist yet."""
+        months = {(t.astimezone(timezone.utc).year, t.astimezone(timezone.utc).month) for t in bar_times}
+        for year, month in months - self._partitions:
+            start = f"{year:04d}-{month:02d}-01 00:00+00"
+            end = f"{year + month // 12:04d}-{month % 12 + 1:02d}-01 00:00+00"
+            session = self.Session()
+            try:
+                session.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {partition_name(year, month)} "
+                    f"PARTITION OF {IntradayBars.__tablename__} FOR VALUES FROM ('{start}') TO ('{end}')"
+                ))
+                session.commit()
+            except DBAPIError as e:
+                session.rollback()
+                if _sqlstate(e) != _DEFAULT_PARTITION_CONFLICT:
+                    raise  # e.g. lost connection: retried on the next flush
+                log.warning("Could not create partition %s, rows go to the default partition: %s",
+                            partition_name(year, month), e.orig)
+            finally:
+                session.close()
+            self._partitions.add((year, month))
+
+    def run(self) -> None:
+        """Consume the provider until it ends or :meth:`stop` is called, flushing periodically."""
+        self._stop.clear()
+        flusher = threading.Thread(target=self._flush_periodically, name='intraday-flush', daemon=True)
+        flusher.start()
+        try:
+            for bar in self.provider.bars():
+                if self._stop.is_set():
+                    break
+                self.on_bar(bar)
+        except BaseException:
+            self._stop.set()
+            flusher.join()
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Final intraday flush failed")  # keep the provider's error
+            raise
+        self._stop.set()
+        flusher.join()
+        self.flush()
+
+    def stop(self) -> None:
+        """Ask :meth:`run` to return after a final flush."""
+        self._stop.set()
+        self.provider.close()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                log.exception("Intraday flush failed; will retry on the next interval")
+
+
+def _sqlstate(error: DBAPIError) -> str | None:
+    """SQLSTATE of the driver error (psycopg exposes ``sqlstate``, psycopg2 ``pgcode``)."""
+    return getattr(error.orig, 'sqlstate', None) or getattr(error.orig, 'pgcode', None)
+
+
+def partition_name(year: int, month: int) -> str:
+    """Name of the monthly partition, e.g. intraday_bars_202503."""
+    return f"{IntradayBars.__tablename__}_{year:04d}{month:02d}"
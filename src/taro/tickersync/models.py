@@ -4,7 +4,8 @@
 from taro.db.models import (
     Base,
     DailyMetrics,
-    Fundamentals
+    Fundamentals,
+    IntradayBars
 )
 
 # Re-export for convenience - tickersync primarily writes to these tables
@@ -12,4 +13,5 @@ __all__ = [
     'Base',
     'DailyMetrics',   # tickersync creates daily metrics records
     'Fundamentals',   # tickersync writes OHLC data here
+    'IntradayBars',   # tickersync flushes 1-minute bars here
 ]
@@ -31,3 +31,100 @@ def database_url():
     password = os.getenv('DB_PASSWORD', 'taro_password')
 
     return f"postgresql://{user}:{password}@{host}:{port}/{name}"
+
+
+@pytest.fixture(scope="session")
+def yf_fixture_dir():
+    """Directory of recorded yf.download responses used by the fetcher tests."""
+    return Path(__file__).parent / 'fixtures' / 'yfinance'
+
+
+@pytest.fixture
+def yf_download(yf_fixture_dir):
+    """yf.download stand-in selected by TARO_YF_MODE: replay (default), record or live.
+
+    In replay mode a call without a recorded response fails the test instead of
+    reaching the fetcher as "no data".
+    """
+    from taro.fetcher.replay import RecordingDownloader, ReplayDownloader
+
+    mode = os.getenv('TARO_YF_MODE', 'replay')
+    if mode == 'record':
+        yield RecordingDownloader(yf_fixture_dir)
+    elif mode == 'live':
+        yield None  # YFinanceFetcher falls back to yf.download
+    else:
+        download = ReplayDownloader(yf_fixture_dir)
+        yield download
+        if download.misses:
+            pytest.fail(f"No recorded response for {download.misses}; record them with TARO_YF_MODE=record")
+
+
+class DailyBarWriter:
+    """Writes daily_metrics and fundamentals rows for test tickers, each in its own transaction."""
+
+    def __init__(self, engine):
+        from sqlalchemy import text
+
+        self.engine = engine
+        self.text = text
+        self.tickers = set()
+
+    def next_id(self, table):
+        """Allocate an id from the table's sequence without inserting, to commit ids out of order."""
+        with self.engine.begin() as connection:
+            return connection.execute(self.text(
+                f"SELECT nextval(pg_get_serial_sequence('{table}', 'id'))"
+            )).scalar()
+
+    def add_metrics(self, ticker, trade_date, metrics_id=None):
+        self.tickers.add(ticker)
+        metrics_id = metrics_id or self.next_id('daily_metrics')
+        with self.engine.begin() as connection:
+            connection.execute(self.text(
+                "INSERT INTO daily_metrics (id, trade_date, ticker) VALUES (:id, :trade_date, :ticker)"
+            ), {'id': metrics_id, 'trade_date': trade_date, 'ticker': ticker})
+        return metrics_id
+
+    def add_fundamentals(self, metrics_id, close, volume=100.0, fundamentals_id=None):
+        fundamentals_id = fundamentals_id or self.next_id('fundamentals')
+        with self.engine.begin() as connection:
+            connection.execute(self.text(
+                "INSERT INTO fundamentals (id, daily_metrics_id, open_price, high_price, close_price, "
+                "low_price, volume) VALUES (:id, :metrics_id, :close, :close, :close, :close, :volume)"
+            ), {'id': fundamentals_id, 'metrics_id': metrics_id, 'close': close, 'volume': volume})
+        return fundamentals_id
+
+    def add_bar(self, ticker, trade_date, close, volume=100.0):
+        metrics_id = self.add_metrics(ticker, trade_date)
+        self.add_fundamentals(metrics_id, close, volume)
+        return metrics_id
+
+    def set_close(self, metrics_id, close):
+        with self.engine.begin() as connection:
+            connection.execute(self.text(
+                "UPDATE fundamentals SET close_price = :close WHERE daily_metrics_id = :metrics_id"
+            ), {'close': close, 'metrics_id': metrics_id})
+
+    def cleanup(self):
+        with self.engine.begin() as connection:
+            for ticker in self.tickers:
+                ids = "SELECT id FROM daily_metrics WHERE ticker = :ticker"
+                connection.execute(self.text(f"DELETE FROM fundamentals WHERE daily_metrics_id IN ({ids})"),
+                                   {'ticker': ticker})
+                connection.execute(self.text("DELETE FROM daily_metrics WHERE ticker = :ticker"),
+                                   {'ticker': ticker})
+
+
+@pytest.fixture
+def daily_bars(database_url):
+    """DailyBarWriter whose rows are deleted after the test."""
+    from sqlalchemy import create_engine
+
+    engine = create_engine(database_url)
+    writer = DailyBarWriter(engine)
+    try:
+        yield writer
+    finally:
+        writer.cleanup()
+        engine.dispose()
@@ -0,0 +1,134 @@
+"""
+Tests for the async (ASGI) analysis service.
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('quart')
+pytest.importorskip('asyncpg')
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from taro.analysis.app import create_app
+from taro.analysis.asgi import create_asgi_app
+
+
+class _Result:
+    def scalar(self):
+        return 1
+
+
+class _SlowQueries:
+    """Replaces AsyncSession.execute/run_sync with sleeps that record overlap and cancellation."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.started = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _sleep(self, result):
+        self.started += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return result
+
+    def install(self, monkeypatch):
+        queries = self
+
+        async def execute(session, statement, *args, **kwargs):
+            return await queries._sleep(_Result())
+
+        async def run_sync(session, fn, *args, **kwargs):
+            return await queries._sleep([])
+
+        monkeypatch.setattr(AsyncSession, 'execute', execute)
+        monkeypatch.setattr(AsyncSession, 'run_sync', run_sync)
+        return self
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def _routes(app):
+    return {
+        (rule.rule, method)
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint != 'static'
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+    }
+
+
+class TestAsgiApp:
+    """ASGI serving mode tests."""
+
+    def test_same_routes_as_flask_app(self):
+        """Test the ASGI app exposes exactly the Flask app's routes and methods."""
+        assert _routes(create_asgi_app()) == _routes(create_app())
+
+    def test_uses_async_driver(self, monkeypatch):
+        """Test the configured database URL is switched to asyncpg with the password hidden."""
+        monkeypatch.setenv('DATABASE_URL', 'postgresql://user:secret@db:5432/taro')
+        app = create_asgi_app()
+        assert app.config['DATABASE_URL'] == 'postgresql+asyncpg://user:***@db:5432/taro'
+
+    def test_timeout_returns_504_and_cancels_queries(self, monkeypatch):
+        """Test a request over REQUEST_TIMEOUT gets a 504 and its in-flight queries are cancelled."""
+        monkeypatch.setenv('REQUEST_TIMEOUT', '0.2')
+        queries = _SlowQueries(delay=30).install(monkeypatch)
+
+        async def request():
+            response = await create_asgi_app().test_client().get('/metrics')
+            return response.status_code, await response.get_json()
+
+        status, body = _run(request())
+        assert status == 504
+        assert 'timed out' in body['error']
+        assert queries.started == 2
+        assert queries.cancelled == 2
+        assert queries.in_flight == 0
+
+    def test_queries_within_a_request_run_concurrently(self, monkeypatch):
+        """Test /metrics/<ticker> issues its two queries at the same time."""
+        queries = _SlowQueries(delay=0.1).install(monkeypatch)
+
+        async def request():
+            response = await create_asgi_app().test_client().get('/metrics/GOOGL')
+            return response.status_code
+
+        assert _run(request()) == 200
+        assert queries.max_in_flight == 2
+
+    def test_resample_locks_per_ticker_and_period(self, monkeypatch):
+        """Test resample requests for different keys overlap while the same key is serialized."""
+        async def overlap(paths):
+            queries = _SlowQueries(delay=0.1).install(monkeypatch)
+            client = create_asgi_app().test_client()
+            responses = await asyncio.gather(*(client.get(path) for path in paths))
+            assert all(r.status_code == 200 for r in responses)
+            return queries.max_in_flight
+
+        assert _run(overlap(['/resample/AAA', '/resample/BBB', '/resample/AAA?period=month'])) == 3
+        assert _run(overlap(['/resample/AAA', '/resample/AAA'])) == 1
+
+    def test_screen_waits_for_the_snapshot(self, monkeypatch):
+        """Test /screen answers 503 until the snapshot is loaded and 400 for a negative limit."""
+        _SlowQueries(delay=0).install(monkeypatch)
+
+        async def request(path):
+            response = await create_asgi_app().test_client().get(path)
+            return response.status_code
+
+        assert _run(request('/screen?q=close>1')) == 503
+        assert _run(request('/screen?q=close>1&limit=-1')) == 400
@@ -0,0 +1,116 @@
+"""
+Tests for the vectorized backtesting engine.
+"""
+
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from taro.analysis.backtest import (
+    load_closes,
+    momentum,
+    rolling_mean,
+    run_backtest,
+    sma_crossover,
+    summary_stats,
+    sweep,
+)
+
+
+def _random_walk(days=300, tickers=3, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.cumprod(1.0 + rng.normal(0.0005, 0.01, size=(days, tickers)), axis=0)
+
+
+class TestBacktest:
+    """Backtest engine tests on synthetic price arrays (no database required)."""
+
+    def test_rolling_mean(self):
+        """Test trailing mean matches a naive loop and skips the warm-up window."""
+        values = np.arange(10, dtype=float)[:, None]
+        result = rolling_mean(values, 3)
+        assert np.isnan(result[:2]).all()
+        np.testing.assert_allclose(result[2:, 0], [values[i - 2:i + 1, 0].mean() for i in range(2, 10)])
+
+    def test_positions_apply_to_next_bar(self):
+        """Test a position taken at close t earns the return of bar t + 1 only."""
+        prices = np.array([100.0, 110.0, 121.0, 121.0])
+        positions = np.array([0.0, 1.0, 0.0, 0.0])
+        result = run_backtest(prices, positions)
+        np.testing.assert_allclose(result.returns, [0.0, 0.0, 0.1, 0.0])
+        assert result.equity[-1] == pytest.approx(1.1)
+
+    def test_costs_and_slippage_charged_on_turnover(self):
+        """Test each unit of turnover pays cost plus slippage."""
+        prices = np.full(4, 100.0)
+        positions = np.array([1.0, 1.0, 0.0, 0.0])
+        result = run_backtest(prices, positions, cost_bps=10, slippage_bps=5)
+        np.testing.assert_allclose(result.returns, [-0.0015, 0.0, -0.0015, 0.0])
+        assert result.stats['turnover'] == pytest.approx(2.0)
+
+    def test_summary_stats(self):
+        """Test CAGR and max drawdown on a known return series."""
+        returns = np.array([0.1, -0.5, 0.5])
+        stats = summary_stats(returns, periods_per_year=3)
+        assert stats['total_return'] == pytest.approx(1.1 * 0.5 * 1.5 - 1.0)
+        assert stats['cagr'] == pytest.approx(stats['total_return'])
+        assert stats['max_drawdown'] == pytest.approx(-0.5)
+
+    def test_strategies_shapes(self):
+        """Test strategies return flat positions during warm-up and match input shape."""
+        prices = _random_walk()
+        for positions in (sma_crossover(prices, fast=5, slow=20), momentum(prices, lookback=10)):
+            assert positions.shape == prices.shape
+            assert set(np.unique(positions)) <= {0.0, 1.0}
+        assert not sma_crossover(prices, fast=5, slow=20)[:19].any()
+
+    def test_sweep_parallel_matches_serial(self):
+        """Test a process-pool sweep over shared memory matches an in-process sweep."""
+        prices = _random_walk()
+        grid = {'fast': [5, 10], 'slow': [20, 40]}
+        serial = sweep(prices, sma_crossover, grid, cost_bps=5, max_workers=1)
+        parallel = sweep(prices, sma_crossover, grid, cost_bps=5, max_workers=2)
+
+        assert len(serial) == 4
+        assert [r['params'] for r in serial] == [r['params'] for r in parallel]
+        for a, b in zip(serial, parallel):
+            assert a['sharpe'] == pytest.approx(b['sharpe'])
+        assert serial[0]['sharpe'] >= serial[-1]['sharpe']
+
+    def test_unlisted_tickers_do_not_dilute_returns(self):
+        """Test a ticker without prices is ignored rather than counted as cash."""
+        prices = _random_walk(tickers=2)
+        positions = np.ones_like(prices)
+        with_gap = np.column_stack([prices, np.full(len(prices), np.nan)])
+        expected = run_backtest(prices, positions)
+        result = run_backtest(with_gap, np.column_stack([positions, np.zeros(len(prices))]))
+        np.testing.assert_allclose(result.returns, expected.returns)
+
+    def test_sweep_skips_invalid_combinations(self):
+        """Test combinations a strategy rejects are left out instead of ranked as flat."""
+        with pytest.raises(ValueError):
+            sma_crossover(_random_walk(), fast=20, slow=20)
+        results = sweep(_random_walk(), sma_crossover, {'fast': [5, 20, 40], 'slow': [20]}, max_workers=1)
+        assert [r['params'] for r in results] == [{'fast': 5, 'slow': 20}]
+
+
+class TestLoadCloses:
+    """Price loading against the database."""
+
+    def test_load_closes_aligns_and_drops_missing(self, database_url, daily_bars):
+        """Test closes are aligned on a shared date axis and tickers without rows are left out."""
+        Session = sessionmaker(bind=create_engine(database_url))
+        daily_bars.add_bar('ZZAAA', date(2099, 1, 5), 10.0)
+        daily_bars.add_bar('ZZAAA', date(2099, 1, 6), 11.0)
+        daily_bars.add_bar('ZZBBB', date(2099, 1, 6), 20.0)
+        daily_bars.add_bar('ZZBBB', date(2099, 1, 7), 21.0)
+
+        with Session() as session:
+            dates, tickers, closes = load_closes(session, ['ZZBBB', 'ZZNOPE', 'ZZAAA'],
+                                                 start=date(2099, 1, 6))
+        assert tickers == ['ZZBBB', 'ZZAAA']
+        assert dates.tolist() == [date(2099, 1, 6), date(2099, 1, 7)]
+        np.testing.assert_array_equal(closes, [[20.0, 11.0], [21.0, np.nan]])
@@ -0,0 +1,140 @@
+"""
+Tests for batched per-ticker metrics.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from taro.analysis import batch
+from taro.analysis.app import create_app
+from taro.analysis.batch import MAX_BATCH_TICKERS, batch_workers, iter_ticker_metrics, query_ticker_metrics
+
+
+@pytest.fixture
+def Session(database_url):
+    engine = create_engine(database_url)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def metrics(daily_bars):
+    """ZZAAA with three closes written out of date order, ZZBBB with a metrics row but no prices."""
+    for day, close in ((2, 11.0), (3, 12.0), (1, 10.0)):
+        daily_bars.add_bar('ZZAAA', date(2099, 1, day), close)
+    daily_bars.add_metrics('ZZBBB', date(2099, 1, 2))
+    return daily_bars
+
+
+@pytest.fixture
+def chunk_log(monkeypatch):
+    """Records the tickers of every chunk query; ``delay`` slows each one down."""
+    class ChunkLog(list):
+        delay = 0.0
+
+    log = ChunkLog()
+    lock = threading.Lock()
+
+    def recording_query(session, tickers):
+        with lock:
+            log.append(tickers)
+        time.sleep(log.delay)
+        return query_ticker_metrics(session, tickers)
+
+    monkeypatch.setattr(batch, 'query_ticker_metrics', recording_query)
+    return log
+
+
+class TestQueryTickerMetrics:
+    """The grouped metrics query against real rows."""
+
+    def test_summarizes_known_and_unknown_tickers(self, Session, metrics):
+        """Test counts, date range and latest close per ticker, in request order."""
+        with Session() as session:
+            rows = query_ticker_metrics(session, ['ZZNONE', 'ZZBBB', 'ZZAAA'])
+        assert rows == [
+            {'ticker': 'ZZNONE', 'data_points': 0, 'first_date': None, 'latest_date': None, 'last_close': None},
+            {'ticker': 'ZZBBB', 'data_points': 1, 'first_date': '2099-01-02', 'latest_date': '2099-01-02',
+             'last_close': None},
+            {'ticker': 'ZZAAA', 'data_points': 3, 'first_date': '2099-01-01', 'latest_date': '2099-01-03',
+             'last_close': 12.0},
+        ]
+
+
+class TestIterTickerMetrics:
+    """Chunked metrics streaming."""
+
+    def test_chunks_dedupe_and_keep_order(self, Session, metrics, chunk_log):
+        """Test duplicates are dropped and unknown tickers keep their place with 0 data points."""
+        rows = list(iter_ticker_metrics(Session, ['ZZZ', 'ZZAAA', 'ZZZ', 'ZZBBB', 'ZZY'], chunk_size=2))
+        assert chunk_log == [['ZZZ', 'ZZAAA'], ['ZZBBB', 'ZZY']]
+        assert [r['ticker'] for r in rows] == ['ZZZ', 'ZZAAA', 'ZZBBB', 'ZZY']
+        assert [r['data_points'] for r in rows] == [0, 3, 1, 0]
+        assert rows[1]['last_close'] == 12.0
+
+    def test_shared_executor_runs_chunks_concurrently(self, Session, metrics, chunk_log):
+        """Test chunks of one request overlap on the shared executor and every ticker is returned once."""
+        chunk_log.delay = 0.1
+        tickers = ['ZZAAA', 'ZZBBB'] + [f'ZZT{i}' for i in range(6)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            started = time.perf_counter()
+            rows = list(iter_ticker_metrics(Session, tickers, chunk_size=1, executor=executor))
+            elapsed = time.perf_counter() - started
+        assert sorted(r['ticker'] for r in rows) == sorted(tickers)
+        assert {r['ticker']: r['data_points'] for r in rows}['ZZAAA'] == 3
+        assert elapsed < 8 * 0.1
+
+    def test_closing_cancels_queued_chunks(self, Session, chunk_log):
+        """Test a client that stops reading doesn't leave its remaining chunks queued on the executor."""
+        chunk_log.delay = 0.05
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            stream = iter_ticker_metrics(Session, [f'ZZT{i}' for i in range(10)], chunk_size=1,
+                                         executor=executor)
+            next(stream)
+            stream.close()
+        assert len(chunk_log) < 10
+
+    def test_workers_leave_a_pooled_connection(self):
+        """Test the shared executor is sized below the engine's connection pool."""
+        class Engine:
+            def __init__(self, size):
+                self.pool = type('Pool', (), {'size': lambda _: size})()
+
+        assert batch_workers(Engine(5)) == 4
+        assert batch_workers(Engine(3)) == 2
+        assert batch_workers(Engine(1)) == 1
+
+
+class TestBatchRoute:
+    """Request validation of /metrics/batch (no database required)."""
+
+    @pytest.fixture
+    def client(self):
+        return create_app().test_client()
+
+    @pytest.mark.parametrize('payload', [
+        {'tickers': []},
+        {'tickers': 'GOOGL'},
+        {'tickers': ['GOOGL', 1]},
+        {},
+        ['GOOGL', 'AAPL'],
+        'GOOGL',
+    ])
+    def test_post_rejects_invalid_body(self, client, payload):
+        """Test malformed JSON bodies get a 400 instead of a server error."""
+        response = client.post('/metrics/batch', json=payload)
+        assert response.status_code == 400
+        assert 'tickers' in response.get_json()['error']
+
+    def test_rejects_empty_query_and_too_many_tickers(self, client):
+        """Test an empty ticker list and oversized requests are rejected."""
+        assert client.get('/metrics/batch?tickers=').status_code == 400
+        response = client.post('/metrics/batch', json={'tickers': ['T'] * (MAX_BATCH_TICKERS + 1)})
+        assert response.status_code == 400
+        assert str(MAX_BATCH_TICKERS) in response.get_json()['error']
@@ -0,0 +1,195 @@
+"""
+Tests for intraday minute-bar ingestion.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from taro.db.models import IntradayBars
+from taro.tickersync.intraday import (
+    IntradayIngestor,
+    MinuteBar,
+    ReplayProvider,
+    RingBuffer,
+    in_market_hours,
+    partition_name,
+)
+
+# 2025-03-10 09:30 America/New_York (EDT)
+OPEN = datetime(2025, 3, 10, 13, 30, tzinfo=timezone.utc)
+# 2099-06-01 09:30 America/New_York (EDT)
+FUTURE_OPEN = datetime(2099, 6, 1, 13, 30, tzinfo=timezone.utc)
+
+
+def _bar(ticker, minute, close, volume=100.0):
+    return MinuteBar(ticker, OPEN + timedelta(minutes=minute), close, close, close, close, volume)
+
+
+class _DriverError(Exception):
+    def __init__(self, message, sqlstate=None):
+        super().__init__(message)
+        self.sqlstate = sqlstate
+
+
+class _FailingSessions:
+    """Sessionmaker stand-in whose sessions fail every statement with ``error``, recording it."""
+
+    def __init__(self):
+        self.error = _DriverError('connection refused')
+        self.statements = []
+
+    def __call__(self):
+        return _FailingSession(self)
+
+
+class _FailingSession:
+    def __init__(self, sessions):
+        self.sessions = sessions
+
+    def execute(self, statement, params=None):
+        self.sessions.statements.append(str(statement))
+        raise OperationalError(str(statement), params, self.sessions.error)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def failing_session():
+    return _FailingSessions()
+
+
+class TestRingBuffer:
+    """Ring buffer behaviour (no database required)."""
+
+    def test_wraps_and_keeps_newest(self):
+        """Test the oldest bars are overwritten once capacity is reached."""
+        buffer = RingBuffer(capacity=3)
+        for minute in range(5):
+            buffer.append(minute * 60, [minute] * 5)
+        times, values = buffer.latest(10)
+        assert times.tolist() == [120, 180, 240]
+        assert values[:, 3].tolist() == [2, 3, 4]
+
+    def test_same_minute_updates_in_place(self):
+        """Test a repeated minute replaces the newest bar and stale bars are ignored."""
+        buffer = RingBuffer(capacity=3)
+        assert buffer.append(60, [1] * 5)
+        assert buffer.append(60, [2] * 5)
+        assert not buffer.append(0, [3] * 5)
+        times, values = buffer.latest(3)
+        assert times.tolist() == [60]
+        assert values[0, 0] == 2
+
+
+class TestIntradayIngestor:
+    """Ingestion from a replay feed."""
+
+    def test_market_hours(self):
+        """Test regular-session filtering in New York time."""
+        assert in_market_hours(OPEN)
+        assert not in_market_hours(OPEN - timedelta(minutes=1))
+        assert not in_market_hours(OPEN + timedelta(hours=6, minutes=30))
+        assert not in_market_hours(OPEN - timedelta(days=1))  # Sunday
+
+    def test_updates_coalesce_before_flush(self):
+        """Test many ticks for the same minute leave one pending row and the latest values."""
+        ingestor = IntradayIngestor(ReplayProvider([]), Session=None, watchlist=['GOOGL'])
+        for tick in range(50):
+            ingestor.on_bar(_bar('GOOGL', 0, 100.0 + tick))
+        assert not ingestor.on_bar(_bar('MSFT', 0, 1.0))
+        assert not ingestor.on_bar(_bar('GOOGL', -5, 1.0))
+
+        assert len(ingestor._pending) == 1
+        latest = ingestor.latest('GOOGL', 5)
+        assert latest['close'].tolist() == [149.0]
+
+    def test_latest_minutes_skips_gaps(self):
+        """Test 'latest N minutes' is measured in time, not in bar count."""
+        ingestor = IntradayIngestor(ReplayProvider([]), Session=None, watchlist=['GOOGL'])
+        for minute in (0, 1, 2, 10, 11):
+            ingestor.on_bar(_bar('GOOGL', minute, float(minute)))
+        assert ingestor.latest('GOOGL', 3)['close'].tolist() == [10.0, 11.0]
+        assert ingestor.latest('GOOGL', 12)['close'].tolist() == [0.0, 1.0, 2.0, 10.0, 11.0]
+
+    def test_latest_rejects_unwatched_ticker(self):
+        """Test asking for a ticker outside the watchlist names the problem."""
+        ingestor = IntradayIngestor(ReplayProvider([]), Session=None, watchlist=['GOOGL'])
+        assert ingestor.latest('GOOGL', 5)['close'].tolist() == []
+        with pytest.raises(KeyError, match='MSFT is not on the intraday watchlist'):
+            ingestor.latest('MSFT', 5)
+
+    def test_flush_failure_keeps_ingesting(self, failing_session):
+        """Test a failing database neither stops on_bar nor grows the backlog without bound."""
+        ingestor = IntradayIngestor(ReplayProvider([]), failing_session, watchlist=['GOOGL'],
+                                    flush_interval=60, max_pending=2, max_backlog=5)
+        for minute in range(10):
+            assert ingestor.on_bar(_bar('GOOGL', minute, float(minute)))
+
+        assert len(failing_session.statements) == 1  # one early flush, then back off
+        assert len(ingestor._pending) == 5
+        assert ingestor.dropped == 5
+        assert ingestor.latest('GOOGL', 10)['close'].tolist() == [float(m) for m in range(10)]
+        with pytest.raises(OperationalError):
+            ingestor.flush()
+        assert len(ingestor._pending) == 5
+
+    def test_run_survives_flush_failures(self, failing_session):
+        """Test a replay against an unreachable database ends with the final flush error."""
+        feed = [_bar('GOOGL', minute, float(minute)) for minute in range(10)]
+        ingestor = IntradayIngestor(ReplayProvider(feed), failing_session, watchlist=['GOOGL'],
+                                    flush_interval=60, max_pending=2)
+        with pytest.raises(OperationalError):
+            ingestor.run()
+        assert len(ingestor._pending) == 10
+
+    def test_partition_retried_after_connection_error(self, failing_session):
+        """Test a month is only remembered once its partition exists or the default holds its rows."""
+        ingestor = IntradayIngestor(ReplayProvider([]), failing_session, watchlist=['GOOGL'])
+        with pytest.raises(OperationalError):
+            ingestor.ensure_partitions([OPEN])
+        assert not ingestor._partitions
+
+        failing_session.error = _DriverError('default partition would be violated', sqlstate='23514')
+        ingestor.ensure_partitions([OPEN])
+        assert ingestor._partitions == {(2025, 3)}
+        assert partition_name(2025, 3) in failing_session.statements[-1]
+
+    def test_replay_flushes_to_partitioned_table(self, database_url):
+        """Test a replayed session lands in a monthly partition with one row per ticker-minute."""
+        engine = create_engine(database_url)
+        Session = sessionmaker(bind=engine)
+        ticker = 'ZZTEST'
+        # A month no real data reaches, so its partition can be dropped afterwards
+        feed = [bar._replace(bar_time=FUTURE_OPEN + (bar.bar_time - OPEN))
+                for bar in (_bar(ticker, minute // 3, 50.0 + minute) for minute in range(30))]
+        ingestor = IntradayIngestor(ReplayProvider(feed), Session, watchlist=[ticker], flush_interval=60)
+        partition = partition_name(FUTURE_OPEN.year, FUTURE_OPEN.month)
+        with Session() as session:
+            existed = session.execute(text("SELECT to_regclass(:name)"), {'name': partition}).scalar()
+
+        try:
+            ingestor.run()
+            with Session() as session:
+                rows = session.query(IntradayBars).filter_by(ticker=ticker).order_by(IntradayBars.bar_time).all()
+                assert len(rows) == 10
+                assert float(rows[-1].close_price) == 79.0
+                assert np.allclose(ingestor.latest(ticker, 2)['close'], [76.0, 79.0])
+        finally:
+            with Session() as session:
+                session.query(IntradayBars).filter_by(ticker=ticker).delete()
+                if not existed:
+                    session.execute(text(f"DROP TABLE IF EXISTS {partition}"))
+                session.commit()
+            engine.dispose()
@@ -0,0 +1,214 @@
+"""
+Tests for the large-table migration helpers.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from alembic.config import Config
+from alembic.operations import Operations
+from alembic.runtime.environment import EnvironmentContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import DBAPIError
+
+from taro.migrations import toolkit
+from taro.migrations.toolkit import (
+    PROGRESS_TABLE,
+    _check_timeout,
+    batched_backfill,
+    create_index_concurrently,
+    estimate_backfill,
+    estimate_index,
+    estimate_table,
+    is_dry_run,
+    reset_backfill,
+)
+from taro.paths import Taro_path
+
+TABLE = 'taro_toolkit_test'
+
+
+class _Result:
+    def __init__(self, row):
+        self.row = row
+
+    def first(self):
+        return self.row
+
+    def scalar(self):
+        return self.row[0]
+
+
+class _FakeBind:
+    """Bind stand-in answering the estimator's statistics, EXPLAIN and min/max queries."""
+    dialect = postgresql.dialect()
+
+    def __init__(self, plan_rows, key_range, statistics=(50000, 1000, 8_192_000, 10_000_000)):
+        self.plan_rows = plan_rows
+        self.key_range = key_range
+        self.statistics = statistics  # reltuples, relpages, heap bytes, total bytes
+
+    def execute(self, statement, params=None):
+        if str(statement).startswith('EXPLAIN'):
+            return _Result(([{'Plan': {'Plan Rows': self.plan_rows}}],))
+        if 'pg_class' in str(statement):
+            return _Result(self.statistics)
+        return _Result(self.key_range)
+
+
+class _FakeOp:
+    def __init__(self, bind):
+        self.bind = bind
+
+    def get_bind(self):
+        return self.bind
+
+
+@contextmanager
+def _migration(connection):
+    """Install alembic's ``op`` and ``context`` proxies as env.py would."""
+    config = Config(str(Taro_path / 'alembic.ini'))
+    with EnvironmentContext(config, ScriptDirectory.from_config(config)) as env:
+        env.configure(connection=connection)
+        with Operations.context(env.get_context()):
+            yield
+
+
+class TestToolkitHelpers:
+    """Helper tests (no database required)."""
+
+    @pytest.mark.parametrize('timeout', ['500ms', '5s', '1min', 30, '2 h'])
+    def test_timeout_accepted(self, timeout):
+        """Test PostgreSQL intervals pass through unchanged."""
+        assert _check_timeout(timeout) == str(timeout)
+
+    @pytest.mark.parametrize('timeout', ["5s; DROP TABLE daily_metrics", "5s'", '', 'soon', '-1s'])
+    def test_timeout_rejects_injection(self, timeout):
+        """Test anything but a bare interval is rejected before reaching SQL."""
+        with pytest.raises(ValueError):
+            _check_timeout(timeout)
+
+    def test_not_dry_run_outside_env(self):
+        """Test helpers called outside env.py behave as a normal run."""
+        assert is_dry_run() is False
+
+    def test_estimate_backfill_batches(self, monkeypatch):
+        """Test batch count covers the key range and time includes the pauses."""
+        monkeypatch.setattr(toolkit, 'op', _FakeOp(_FakeBind(40000, (1, 25000))))
+        estimate = estimate_backfill('fundamentals', 'vwap IS NULL', batch_size=10000, pause=0.5,
+                                     rows_per_second=20000)
+        assert estimate == {'rows': 40000, 'batches': 3, 'seconds': 3.5}
+
+        monkeypatch.setattr(toolkit, 'op', _FakeOp(_FakeBind(0, (None, None))))
+        assert estimate_backfill('fundamentals', 'vwap IS NULL')['batches'] == 0
+
+    def test_estimate_index_time(self, monkeypatch):
+        """Test the build time covers two scans of the heap at the assumed rate."""
+        monkeypatch.setattr(toolkit, 'op', _FakeOp(_FakeBind(0, (None, None))))
+        assert estimate_index('fundamentals', bytes_per_second=1_000_000) == {
+            'rows': 50000, 'bytes': 10_000_000, 'seconds': 16.4,
+        }
+
+
+class TestEstimates:
+    """Estimates against the database."""
+
+    @pytest.fixture
+    def table(self, database_url):
+        """88 rows, 8 of them not yet backfilled, in a table that was never analyzed."""
+        engine = create_engine(database_url)
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+            connection.execute(text(f"CREATE TABLE {TABLE} (id serial PRIMARY KEY, val int, done int)"))
+            connection.execute(text(
+                f"INSERT INTO {TABLE} (val, done) SELECT g, CASE WHEN g > 80 THEN NULL ELSE g END "
+                f"FROM generate_series(1, 88) g"
+            ))
+        try:
+            yield engine
+        finally:
+            with engine.begin() as connection:
+                connection.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+            engine.dispose()
+
+    def test_missing_statistics_fall_back_to_counts(self, table, caplog):
+        """Test a never-analyzed table is counted, with a warning, instead of estimated as empty."""
+        with table.connect() as connection, _migration(connection):
+            estimate = estimate_table(TABLE)
+            assert (estimate['rows'], estimate['analyzed']) == (88, False)
+            assert estimate_backfill(TABLE, 'done IS NULL')['rows'] == 8
+        assert 'ANALYZE' in caplog.text
+
+        with table.begin() as connection:
+            connection.execute(text(f"ANALYZE {TABLE}"))
+        caplog.clear()
+        with table.connect() as connection, _migration(connection):
+            assert estimate_table(TABLE)['rows'] == 88
+            assert estimate_index(TABLE)['seconds'] >= 0
+        assert 'ANALYZE' not in caplog.text
+
+    def test_index_build_sets_no_lock_timeout(self, table):
+        """Test the default build leaves lock_timeout alone and produces a valid index."""
+        index = f'ix_{TABLE}_val'
+        with table.connect() as connection, _migration(connection):
+            statements = []
+
+            def record(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(connection, 'before_cursor_execute', record)
+            create_index_concurrently(index, TABLE, ['val'])
+            event.remove(connection, 'before_cursor_execute', record)
+        assert any('CREATE INDEX CONCURRENTLY' in statement for statement in statements)
+        assert not any('lock_timeout' in statement for statement in statements)
+        with table.connect() as connection:
+            assert connection.execute(text(
+                "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"
+            ), {'name': index}).scalar()
+
+
+class TestBatchedBackfill:
+    """Backfill against the database."""
+
+    def test_interrupted_backfill_resumes(self, database_url):
+        """Test a failed batch leaves the last committed checkpoint and a rerun finishes from it."""
+        engine = create_engine(database_url)
+        name = f'{TABLE}_done'
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+            connection.execute(text(f"CREATE TABLE {TABLE} (id serial PRIMARY KEY, val int, done int)"))
+            connection.execute(text(f"INSERT INTO {TABLE} (val) SELECT g FROM generate_series(1, 50) g"))
+
+        def progress():
+            with engine.connect() as connection:
+                return connection.execute(text(
+                    f"SELECT last_key, rows_done FROM {PROGRESS_TABLE} WHERE name = :name"
+                ), {'name': name}).first()
+
+        try:
+            # Division by zero from id 26 on fails the third batch
+            with engine.connect() as connection, _migration(connection):
+                with pytest.raises(DBAPIError):
+                    batched_backfill(name, TABLE, set_sql='done = val * 2 / (CASE WHEN id > 25 THEN 0 ELSE 1 END)',
+                                     where_sql='done IS NULL', batch_size=10, pause=0)
+            assert tuple(progress()) == (20, 20)
+
+            with engine.connect() as connection, _migration(connection):
+                assert batched_backfill(name, TABLE, set_sql='done = val * 2', where_sql='done IS NULL',
+                                        batch_size=10, pause=0) == 30
+                assert batched_backfill(name, TABLE, set_sql='done = val * 2', where_sql='done IS NULL',
+                                        batch_size=10, pause=0) == 0
+            assert tuple(progress()) == (50, 50)
+
+            with engine.connect() as connection:
+                assert connection.execute(text(
+                    f"SELECT count(*) FROM {TABLE} WHERE done = val * 2"
+                )).scalar() == 50
+        finally:
+            with engine.connect() as connection, _migration(connection):
+                reset_backfill(name)
+                connection.commit()
+            with engine.begin() as connection:
+                connection.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
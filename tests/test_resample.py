@@ -0,0 +1,134 @@
+"""
+Tests for resampling daily bars into coarser periods.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from taro.analysis import resample
+from taro.analysis.resample import ResampleCache, bucket_bounds, parse_period
+
+TICKER = 'ZZRESAMP'
+
+# Mondays of three consecutive weeks
+WEEKS = [date(2099, 1, 5), date(2099, 1, 12), date(2099, 1, 19)]
+
+
+class TestResamplePeriods:
+    """Period parsing and bucket boundaries (no database required)."""
+
+    def test_parse_period(self):
+        """Test calendar and custom periods are accepted."""
+        assert parse_period('week') == ('week', 1)
+        assert parse_period('month') == ('month', 1)
+        assert parse_period('10d') == ('day', 10)
+
+    @pytest.mark.parametrize('period', ['', 'weekly', '0d', '-3d', 'd'])
+    def test_parse_period_rejects_unknown(self, period):
+        """Test unsupported periods raise ValueError."""
+        with pytest.raises(ValueError):
+            parse_period(period)
+
+    def test_week_bucket_starts_on_monday(self):
+        """Test weekly buckets match PostgreSQL date_trunc('week')."""
+        # 2025-03-13 is a Thursday
+        assert bucket_bounds('week', date(2025, 3, 13)) == (date(2025, 3, 10), date(2025, 3, 17))
+        assert bucket_bounds('week', date(2025, 3, 10)) == (date(2025, 3, 10), date(2025, 3, 17))
+
+    def test_month_quarter_year_buckets(self):
+        """Test calendar buckets roll over year boundaries."""
+        assert bucket_bounds('month', date(2024, 12, 31)) == (date(2024, 12, 1), date(2025, 1, 1))
+        assert bucket_bounds('quarter', date(2025, 5, 20)) == (date(2025, 4, 1), date(2025, 7, 1))
+        assert bucket_bounds('quarter', date(2025, 11, 2)) == (date(2025, 10, 1), date(2026, 1, 1))
+        assert bucket_bounds('year', date(2025, 5, 20)) == (date(2025, 1, 1), date(2026, 1, 1))
+
+    def test_custom_day_buckets_are_contiguous(self):
+        """Test '<n>d' buckets tile the calendar without gaps or overlaps."""
+        start, end = bucket_bounds('10d', date(2025, 3, 13))
+        assert (end - start).days == 10
+        assert start <= date(2025, 3, 13) < end
+        assert bucket_bounds('10d', end)[0] == end
+        # 7-day buckets coincide with calendar weeks
+        assert bucket_bounds('7d', date(2025, 3, 13)) == bucket_bounds('week', date(2025, 3, 13))
+
+
+@pytest.fixture
+def Session(database_url):
+    engine = create_engine(database_url)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def aggregations(monkeypatch):
+    """(period, start, end) of every aggregate_bars call made by the cache."""
+    calls = []
+    aggregate_bars = resample.aggregate_bars
+
+    def recording(session, ticker, period, start=None, end=None):
+        calls.append((period, start, end))
+        return aggregate_bars(session, ticker, period, start=start, end=end)
+
+    monkeypatch.setattr(resample, 'aggregate_bars', recording)
+    return calls
+
+
+def _closes(cache, Session, period='week'):
+    with Session() as session:
+        return {bar['period_start']: bar['close'] for bar in cache.get(session, TICKER, period)}
+
+
+class TestResampleCache:
+    """Cache invalidation against the database."""
+
+    @pytest.fixture(autouse=True)
+    def three_weeks(self, daily_bars):
+        self.bar_ids = [daily_bars.add_bar(TICKER, monday, 10.0 * (i + 1)) for i, monday in enumerate(WEEKS)]
+
+    def test_new_row_refreshes_only_its_bucket(self, Session, daily_bars, aggregations):
+        """Test an ingest re-aggregates the one touched week and serves the others from cache."""
+        cache = ResampleCache()
+        assert list(_closes(cache, Session).values()) == [10.0, 20.0, 30.0]
+
+        daily_bars.add_bar(TICKER, WEEKS[1] + timedelta(days=2), 25.0)
+        aggregations.clear()
+        assert list(_closes(cache, Session).values()) == [10.0, 25.0, 30.0]
+        assert aggregations == [('week', WEEKS[1], WEEKS[2])]
+
+        aggregations.clear()
+        _closes(cache, Session)
+        assert aggregations == []
+
+    def test_late_commits_are_picked_up(self, Session, daily_bars):
+        """Test a lower id committed after a higher one, and a later fundamentals row, invalidate buckets."""
+        cache = ResampleCache()
+        early_id = daily_bars.next_id('daily_metrics')
+        daily_bars.add_bar(TICKER, WEEKS[2] + timedelta(days=1), 31.0)
+        pending_id = daily_bars.add_metrics(TICKER, WEEKS[2] + timedelta(days=3))
+        assert _closes(cache, Session)[WEEKS[2].isoformat()] == 31.0
+
+        daily_bars.add_fundamentals(daily_bars.add_metrics(TICKER, WEEKS[0] + timedelta(days=1), early_id), 11.0)
+        daily_bars.add_fundamentals(pending_id, 33.0)
+        closes = _closes(cache, Session)
+        assert (closes[WEEKS[0].isoformat()], closes[WEEKS[2].isoformat()]) == (11.0, 33.0)
+
+    def test_updated_rows_are_rebuilt_after_max_age(self, Session, daily_bars):
+        """Test restated prices are served once the entry expires."""
+        cache = ResampleCache(max_age=3600)
+        _closes(cache, Session)
+        daily_bars.set_close(self.bar_ids[0], 12.0)
+        assert _closes(cache, Session)[WEEKS[0].isoformat()] == 10.0
+
+        cache.max_age = 0
+        assert _closes(cache, Session)[WEEKS[0].isoformat()] == 12.0
+
+    def test_entries_are_capped(self, Session):
+        """Test the least recently used (ticker, period) entry is evicted."""
+        cache = ResampleCache(max_entries=2)
+        for period in ('week', 'month', 'week', '10d'):
+            _closes(cache, Session, period)
+        assert len(cache) == 2
+        assert set(cache._bars) == {(TICKER, 'week'), (TICKER, '10d')}
@@ -0,0 +1,155 @@
+"""
+Tests for the in-memory universe screener.
+"""
+
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from taro.analysis.app import create_app
+from taro.analysis.screener import MAX_EXPRESSION_LENGTH, ScreenExpressionError, UniverseSnapshot
+
+
+def _rows(ticker, closes, volumes, start=date(2025, 1, 1)):
+    return [
+        (start + timedelta(days=i), ticker, c, c, c, c, v)
+        for i, (c, v) in enumerate(zip(closes, volumes))
+    ]
+
+
+@pytest.fixture
+def snapshot():
+    """Snapshot with a breakout ticker, a flat ticker and a recently listed ticker."""
+    snap = UniverseSnapshot(window_days=30)
+    snap.apply_rows(
+        _rows('UP', [10.0] * 29 + [20.0], [100.0] * 29 + [500.0])
+        + _rows('FLAT', [10.0] * 30, [100.0] * 30)
+        + _rows('NEW', [50.0] * 5, [100.0] * 5, start=date(2025, 1, 26))
+    )
+    return snap
+
+
+class TestUniverseSnapshot:
+    """Snapshot maintenance and screen evaluation (no database required)."""
+
+    def test_apply_rows_builds_columnar_arrays(self, snapshot):
+        """Test rows land in (days, tickers) arrays with NaN for missing bars."""
+        assert snapshot.tickers == ['UP', 'FLAT', 'NEW']
+        assert snapshot.data['close'].shape == (30, 3)
+        assert np.isnan(snapshot.data['close'][0, 2])
+        assert snapshot.data['close'][-1].tolist() == [20.0, 10.0, 50.0]
+
+    def test_window_rolls_forward(self, snapshot):
+        """Test new days push the oldest days out of the window."""
+        snapshot.apply_rows([(date(2025, 1, 31), 'FLAT', 11.0, 11.0, 11.0, 11.0, 100.0)])
+        assert len(snapshot.dates) == 30
+        assert snapshot.dates[0] == np.datetime64('2025-01-02')
+        assert snapshot.data['close'][-2, 0] == 20.0
+        assert snapshot.data['close'][-1].tolist()[1] == 11.0
+        assert np.isnan(snapshot.data['close'][-1, 0])
+
+    def test_screen_volume_breakout(self, snapshot):
+        """Test the classic SMA plus volume-surge screen."""
+        result = snapshot.screen('close > sma(close, 20) and volume > 3 * sma(volume, 20)')
+        assert result['as_of'] == '2025-01-30'
+        assert [m['ticker'] for m in result['matches']] == ['UP']
+
+    def test_screen_excludes_short_history(self, snapshot):
+        """Test tickers without a full window never match a window function."""
+        result = snapshot.screen('close >= sma(close, 10)')
+        assert [m['ticker'] for m in result['matches']] == ['UP', 'FLAT']
+
+    def test_screen_functions_and_chains(self, snapshot):
+        """Test chained comparisons, not, and the remaining window functions."""
+        assert snapshot.screen('change(close, 1) > 0.5')['count'] == 1
+        assert snapshot.screen('prev(close, 1) == 10')['count'] == 2
+        assert snapshot.screen('5 < close <= 20 and not volume > 200')['matches'][0]['ticker'] == 'FLAT'
+        assert snapshot.screen('highest(close, 5) == lowest(close, 5)', limit=1)['count'] == 2
+
+    @pytest.mark.parametrize('expression', [
+        'close >',
+        '__import__("os")',
+        'price > 1',
+        'sma(close) > 1',
+        'sma(close, 0) > 1',
+        'sma(close, 31) > 1',
+        'close + 1',
+        'close.real > 1',
+    ])
+    def test_screen_rejects_invalid_expressions(self, snapshot, expression):
+        """Test malformed or unsafe expressions raise ScreenExpressionError."""
+        with pytest.raises(ScreenExpressionError):
+            snapshot.screen(expression)
+
+    def test_screen_rejects_oversized_input(self, snapshot):
+        """Test long or deeply nested expressions and negative limits are rejected up front."""
+        with pytest.raises(ScreenExpressionError, match=str(MAX_EXPRESSION_LENGTH)):
+            snapshot.screen('close > 1 and ' * 1000 + 'close > 1')
+        with pytest.raises(ScreenExpressionError, match='nested'):
+            snapshot.screen('-' * (MAX_EXPRESSION_LENGTH - 10) + '1 < close')
+        with pytest.raises(ValueError):
+            snapshot.screen('close > 1', limit=-1)
+
+
+class TestSnapshotRefresh:
+    """Incremental refresh against the database."""
+
+    def test_refresh_picks_up_late_commits(self, database_url, daily_bars):
+        """Test rows committed below the watermark, or joined by a later fundamentals row, still arrive."""
+        Session = sessionmaker(bind=create_engine(database_url))
+        day = date(2099, 1, 5)
+        snapshot = UniverseSnapshot(window_days=5, recheck_interval=0)
+
+        early_id = daily_bars.next_id('daily_metrics')
+        daily_bars.add_bar('ZZLATE', day, 10.0)
+        pending_id = daily_bars.add_metrics('ZZSPLIT', day)
+        with Session() as session:
+            snapshot.refresh(session)
+        assert 'ZZSPLIT' not in snapshot.tickers
+
+        # Lower daily_metrics id committing after a higher one was applied
+        daily_bars.add_fundamentals(daily_bars.add_metrics('ZZEARLY', day, metrics_id=early_id), 20.0)
+        # Fundamentals committed in a separate, later transaction
+        daily_bars.add_fundamentals(pending_id, 30.0)
+        with Session() as session:
+            assert snapshot.refresh(session) >= 3
+
+        closes = dict(zip(snapshot.tickers, snapshot.data['close'][-1]))
+        assert (closes['ZZLATE'], closes['ZZEARLY'], closes['ZZSPLIT']) == (10.0, 20.0, 30.0)
+
+    def test_refresh_skips_unchanged_tables(self, database_url, daily_bars):
+        """Test a refresh with no new ids and a recent re-read does not query rows."""
+        Session = sessionmaker(bind=create_engine(database_url))
+        daily_bars.add_bar('ZZSAME', date(2099, 1, 5), 10.0)
+        snapshot = UniverseSnapshot(window_days=5)
+        with Session() as session:
+            assert snapshot.refresh(session) > 0
+            assert snapshot.refresh(session) == 0
+
+
+class TestScreenRoute:
+    """The /screen endpoint of the Flask app."""
+
+    def test_rejects_bad_parameters(self):
+        """Test a missing expression or a negative limit gets a 400 without touching the snapshot."""
+        client = create_app().test_client()
+        assert client.get('/screen').status_code == 400
+        response = client.get('/screen?q=close>1&limit=-1')
+        assert response.status_code == 400
+        assert 'limit' in response.get_json()['error']
+
+    def test_serves_the_warmed_snapshot(self, database_url, daily_bars):
+        """Test the snapshot loaded at startup answers screens and bad expressions get a 400."""
+        daily_bars.add_bar('ZZSCREEN', date(2099, 1, 5), 10.0)
+        client = create_app().test_client()
+        deadline = time.monotonic() + 30
+        while (response := client.get('/screen?q=close>0')).status_code == 503:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        assert response.status_code == 200
+        assert 'ZZSCREEN' in [m['ticker'] for m in response.get_json()['matches']]
+        assert client.get('/screen', query_string={'q': 'x' * 2000}).status_code == 400